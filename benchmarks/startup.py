@@ -0,0 +1,54 @@
+"""Measures how long fupdate takes to show a stored upgrade report, which is what every interactive run does after a --daemon refresh.
+Usage: python benchmarks/startup.py [number of runs]"""
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import statistics
+
+fupdatePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fupdate.py")
+heavyModules = ["requests", "termcolor", "pyuac", "http"]
+
+def timeCommand(command: list[str], runs: int) -> list[float]:
+	timings = []
+	for _ in range(runs):
+		start = time.perf_counter()
+		subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+		timings.append(time.perf_counter() - start)
+	return timings
+
+def getImportedModules(command: list[str]) -> set[str]:
+	"""Runs command with -X importtime and returns the top level modules it imported"""
+	result = subprocess.run(command[:1] + ["-X", "importtime"] + command[1:], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+	modules = set()
+	for line in result.stderr.splitlines():
+		if line.startswith("import time:") and "|" in line:
+			modules.add(line.split("|")[-1].strip().split(".")[0])
+	return modules
+
+def main():
+	runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+	with tempfile.TemporaryDirectory() as directory:
+		reportPath = os.path.join(directory, "report.json")
+		with open(reportPath, "w", encoding="utf-8") as reportFile:
+			# The candidates are stored by column, like UpgradeCandidates.toJSON() does
+			candidates = {column: [] for column in ["manager", "name", "old", "new", "bump", "source", "notify", "changelog", "changelogURL", "seeMore"]}
+			json.dump({"created": time.time(), "devMode": True, "candidates": candidates, "log": ""}, reportFile)
+
+		baseline = [sys.executable, "-c", "pass"]
+		fupdate = [sys.executable, fupdatePath, "--dev-mode", "--check-only", "--report", reportPath]
+
+		baselineTimings = timeCommand(baseline, runs)
+		fupdateTimings = timeCommand(fupdate, runs)
+		importedModules = getImportedModules(fupdate)
+
+	print("Runs: " + str(runs))
+	print("python -c pass:              median " + format(statistics.median(baselineTimings) * 1000, ".1f") + " ms, min " + format(min(baselineTimings) * 1000, ".1f") + " ms")
+	print("fupdate.py --check-only:     median " + format(statistics.median(fupdateTimings) * 1000, ".1f") + " ms, min " + format(min(fupdateTimings) * 1000, ".1f") + " ms")
+	print("Heavy modules imported:      " + (", ".join(module for module in heavyModules if module in importedModules) or "none"))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,114 @@
+"""Compares the version engine of fupdate (compileVersion/classifyVersionChanges) with the semver based comparison it replaced.
+The old comparison needs the semver package: pip install semver
+Usage: python benchmarks/versions.py [number of version pairs]"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fupdate
+
+def legacyForceSemver(version: str):
+	"""forceSemver as it was before the version engine, without the error messages.
+	It used to parse 2 part versions twice, which raises a TypeError on semver 3, so that is fixed here"""
+	import semver
+
+	try:
+		return semver.VersionInfo.parse(version)
+	except ValueError:
+		if version.startswith("v"):
+			version = version[1:]
+
+		versionSplit = version.split(".")
+		for index, versionSegment in enumerate(versionSplit):
+			try:
+				versionSplit[index] = str(int(versionSegment))
+			except ValueError:
+				return None
+			version = ".".join(versionSplit)
+
+		if len(versionSplit) == 2:
+			version = version + ".0"
+		elif len(versionSplit) != 3:
+			return None
+
+	return semver.VersionInfo.parse(version)
+
+def legacyClassifyVersionChanges(newVersions: list[str], oldVersions: list[str]) -> list[str | None]:
+	"""The comparison parseVersions used to do, one pair at a time"""
+	bumps = []
+	for newVersion, oldVersion in zip(newVersions, oldVersions):
+		semverNewVersion = legacyForceSemver(fupdate.stripLeadingV(newVersion))
+		semverOldVersion = legacyForceSemver(fupdate.stripLeadingV(oldVersion))
+		if semverNewVersion is None or semverOldVersion is None:
+			bumps.append(None)
+		elif semverNewVersion <= semverOldVersion:
+			bumps.append("")
+		elif semverNewVersion.major > semverOldVersion.major:
+			bumps.append("major")
+		elif semverNewVersion.minor > semverOldVersion.minor:
+			bumps.append("minor")
+		else:
+			bumps.append("patch")
+	return bumps
+
+def generateVersionPairs(count: int) -> list[list[str]]:
+	"""[new versions, old versions] in the shapes seen in the wild: semver, 2 and 4 part, calver, pre-releases and go pseudo-versions"""
+	generator = random.Random(0)
+	number = lambda: str(generator.randint(0, 30))
+
+	def versionPair() -> list[str]:
+		shape = generator.randrange(6)
+		if shape == 0:
+			old = [number(), number(), number()]
+		elif shape == 1:
+			old = [number(), number()]
+		elif shape == 2:
+			old = [number(), number(), number(), str(generator.randint(0, 99))]
+		elif shape == 3:
+			old = [str(generator.randint(20, 24)), format(generator.randint(1, 12), "02"), format(generator.randint(1, 28), "02")]
+		elif shape == 4:
+			old = [number(), number(), number()]
+			return ["v" + ".".join(old), "v" + ".".join(old) + "-rc." + number()]
+		else:
+			timestamp = generator.randint(20200101000000, 20231231235959)
+			return ["v0.0.0-" + str(timestamp + 10**8) + "-2d6232701089", "v0.0.0-" + str(timestamp) + "-2d6232701089"]
+
+		new = list(old)
+		position = generator.randrange(len(new))
+		new[position] = format(int(new[position]) + 1, "0" + str(len(new[position])))
+		return [".".join(new), ".".join(old)]
+
+	pairs = [versionPair() for _ in range(count)]
+	return [[new for new, old in pairs], [old for new, old in pairs]]
+
+def timeFunction(function, newVersions: list[str], oldVersions: list[str]) -> list:
+	start = time.perf_counter()
+	bumps = function(newVersions, oldVersions)
+	return [time.perf_counter() - start, bumps]
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	newVersions, oldVersions = generateVersionPairs(count)
+
+	try:
+		legacySeconds, legacyBumps = timeFunction(legacyClassifyVersionChanges, newVersions, oldVersions)
+	except ImportError:
+		print("semver is not installed, so the old comparison can't be measured: pip install semver")
+		legacySeconds, legacyBumps = None, []
+
+	fupdate.compileVersion.cache_clear()
+	coldSeconds, bumps = timeFunction(fupdate.classifyVersionChanges, newVersions, oldVersions)
+	warmSeconds = timeFunction(fupdate.classifyVersionChanges, newVersions, oldVersions)[0]
+
+	print("Version pairs: " + str(count))
+	if legacySeconds is not None:
+		print("parseVersions (semver):       " + format(legacySeconds * 1000, ".1f") + " ms, " + str(sum(1 for bump in legacyBumps if bump is not None)) + " pairs classified")
+	print("classifyVersionChanges:       " + format(coldSeconds * 1000, ".1f") + " ms, " + str(sum(1 for bump in bumps if bump is not None)) + " pairs classified")
+	print("classifyVersionChanges again: " + format(warmSeconds * 1000, ".1f") + " ms (compiled versions are cached)")
+	if legacyBumps:
+		print("Classified differently:       " + str(sum(1 for old, new in zip(legacyBumps, bumps) if old is not None and old != new)) + " pairs (calendar versions and pre-releases)")
+
+if __name__ == "__main__":
+	main()
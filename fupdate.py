@@ -1,15 +1,25 @@
 import os
 import re
-import semver
-import requests
+import sys
+import io
 import json
-from termcolor import colored
 import urllib.parse
 import subprocess
 import argparse
-
-#https://gist.github.com/sylvainpelissier/ff072a6759082590a4fe8f7e070a4952
-import pyuac
+import threading
+import queue
+import time
+import codecs
+import locale
+import contextlib
+import traceback
+import fnmatch
+import datetime
+import socket
+import collections
+import itertools
+import concurrent.futures
+import functools
 
 """
 1. Get list of all outdated packages
@@ -20,10 +30,23 @@ import pyuac
 
 parser = argparse.ArgumentParser(
 	prog = 'fupdate.py',
-	description = 'Updates packages and gets their changelogs. Supports Chocolatey, pip, python venvs, gup and git clones.'
+	description = 'Updates packages and gets their changelogs. Supports Chocolatey, pip, python venvs, gup, git clones, npm, scoop and winget.'
 )
 parser.add_argument("--dev-mode", action='store_true')
-args = parser.parse_args()
+parser.add_argument("--log-file", help="Append the output of every upgrade command to this file")
+parser.add_argument("--daemon", action='store_true', help="Keep running in the background, refreshing the upgrade report every --interval minutes")
+parser.add_argument("--interval", type=float, help="Minutes between refreshes in --daemon mode")
+parser.add_argument("--refresh", action='store_true', help="Ignore the stored upgrade report and check every package manager again")
+parser.add_argument("--report", help="Path of the upgrade report. Defaults to %%LOCALAPPDATA%%\\fupdate\\report.json")
+parser.add_argument("--check-only", action='store_true', help="Only show the available upgrades. Doesn't need admin privileges")
+parser.add_argument("--plan", help=argparse.SUPPRESS)
+parser.add_argument("--resume", action='store_true', help="Finish the last upgrade if it was interrupted or some of its steps failed, without checking the package managers again")
+parser.add_argument("-y", "--yes", action='store_true', help="Don't ask for confirmation. Upgrade everything allowed by upgradePolicySettings")
+parser.add_argument("--policy", help="JSON file that overrides upgradePolicySettings, versionNotificationSettings and generalUpgradeSettings. Implies --yes")
+parser.add_argument("--coordinator", nargs="?", const="127.0.0.1:8765", metavar="HOST:PORT", help="Serve the discovery results of many agents, fetching every changelog only once for all of them")
+parser.add_argument("--agent", metavar="URL", help="Let the coordinator at URL fetch the changelogs and build the upgrade plan")
+# Don't consume the arguments of whoever imports this file
+args = parser.parse_args() if __name__ == "__main__" else parser.parse_args([])
 devMode = args.dev_mode
 ######################################################################################
 #								USER CUSTOMIZABLE SETTINGS
@@ -42,18 +65,67 @@ generalUpgradeSettings={
 	"pip": True,
 	"pipVenvs": True,
 	"git": True,
-	"choco": True
-	# "npm": True
+	"choco": True,
+	# Global packages of `npm install -g`. Use npmWhitelistedPackages to pick which ones
+	"npm": False,
+	"scoop": False,
+	"winget": False
 }
+changelogSettings={
+	# Changelogs longer than this are truncated with a link to the full release notes. 0 means no limit
+	"Max lines": 40,
+	"Max bytes": 8192,
+	# Convert markdown to plain terminal text and drop boilerplate (badges, HTML comments, horizontal rules...)
+	"Collapse markdown": True,
+	# How many changelogs are downloaded at the same time
+	"Parallel downloads": 8,
+	# How long a downloaded changelog is shared with later requests, like other agents of the --coordinator. Errors are never shared
+	"Cache minutes": 60
+	}
+commandOutputSettings={
+	# How often (in seconds) the output of the upgrade commands is written to the terminal
+	"Flush interval": 0.1,
+	"Read size": 65536,
+	# Leave empty to use the system encoding
+	"Encoding": "",
+	# Leave empty to disable. Can also be set with --log-file
+	"Log file": ""
+	}
+githubSettings={
+	# Below this many API requests left, tags are resolved with `git ls-remote`, which doesn't use the API quota. Without a github token, git ls-remote is always used
+	"Minimum API requests left": 500,
+	# How long the tags found with git ls-remote are reused
+	"Tag cache minutes": 60
+	}
+scheduleSettings={
+	# How often the upgrade report is refreshed in --daemon mode
+	"Refresh interval minutes": 60,
+	# Reports older than this are ignored and every package manager is checked again
+	"Report max age minutes": 180
+	}
+# Decides what gets upgraded in unattended runs (--yes or --policy)
+upgradePolicySettings={
+	"Major Versions": True,
+	"Minor Versions": True,
+	"Patch Versions": True,
+	# Glob patterns matched against "manager:package" and "package", like "choco:firefox" or "dotnet-*". Deny wins over allow. An empty allow list allows everything
+	"Allow": [],
+	"Deny": [],
+	# {pattern: version}. Matching packages are only upgraded within that version, so "golang": "1.19" allows 1.19.5 but not 1.20.0
+	"Pinned": {},
+	# Skip releases younger than this. Packages whose release date can't be found are skipped too
+	"Minimum age days": 0,
+	# Overrides of the settings above for a single manager, like {"choco": {"Major Versions": False}}
+	"Managers": {}
+	}
 ######################################################################################
 #				USER MODIFIYABLE FUNCTIONS ARE AT THE BOTTOM OF THE FILE
 ######################################################################################
-# npm support is disabled until they fix `npm outdated -g`
-# https://github.com/npm/cli/issues/6098
-
-numberOfMajorUpgrades = 0
-numberOfMinorUpgrades = 0
-numberOfPatchUpgrades = 0
+# requests, termcolor and pyuac are imported the first time they're needed, so runs that only read the upgrade report start instantly
+def colored(text, color=None, attrs=None):
+	"""Lazy termcolor.colored"""
+	from termcolor import colored as termcolorColored
+	return termcolorColored(text, color, attrs=attrs)
 
 def error(message):
 	print(colored("\tERROR: ", "red") + message + "\n")
@@ -64,16 +136,109 @@ def warning(message):
 def info(message):
 	print("[+] " + message)
 
-if not pyuac.isUserAdmin():
-	error("Admin privileges are needed!")
-	exit()
-
 # Setup githubtoken
-try:
-	githubToken = os.environ["fupdate-github-token"]
-except KeyError:
-	warning("No github token detected. Please set the environment variable " + colored("fupdate-github-token", "yellow") + " to your github personal access token. Without it, we can't fetch the changelogs.")
-	githubToken = ""
+githubToken = os.environ.get("fupdate-github-token", "")
+
+# Agents (--agent) leave fetching the changelogs to the coordinator
+fetchChangelogs = True
+
+# Cache of the JSON responses of the github and pypi APIs: {url: [timeFetched, statusCode, json]}
+# It is kept alive between refreshes in --daemon mode, so changelogs are only downloaded once
+responseCache = {}
+
+# What the X-RateLimit headers of the last github API response said. remaining is None until the first request
+githubQuota = {"remaining": None, "reset": 0, "announced": False}
+
+# Latest tag of every repository resolved with git ls-remote: {repo URL: [timeFetched, tag]}
+gitTagCache = {}
+
+# Every way of reaching a github repo (gup modules, pypi Source URLs, choco Software Source, git clones...) shares its changelog requests:
+# {(owner, repo, tag): [timeRequested, Future resolving to the changelog]}. Cleared at the start of every discovery
+githubChangelogs = {}
+githubChangelogStatistics = {"requested": 0, "fetched": 0}
+githubChangelogLock = threading.Lock()
+
+
+class UpgradeCandidate:
+	"""A package that can be upgraded.\n
+	source is where the package lives for managers that need it, like the path of a venv or a git clone.
+	notify is True if the changelog should be shown, according to versionNotificationSettings.
+	released is the timestamp of the new version, for managers whose release dates only the local machine can find (see ManagerBackend.localReleaseDates)"""
+	__slots__ = ("manager", "name", "old", "new", "bump", "source", "notify", "changelog", "changelogURL", "seeMore", "released")
+
+	def __init__(self, manager: str, name: str, old: str, new: str, bump: str, source: str = "", notify: bool = False, changelog: str | None = None, changelogURL: str = "", seeMore: str = "", released: float | None = None):
+		self.manager = manager
+		self.name = name
+		self.old = old
+		self.new = new
+		self.bump = bump
+		self.source = source
+		self.notify = notify
+		# Only filled in when the changelog is fetched by someone else, like the fleet coordinator
+		self.changelog = changelog
+		self.changelogURL = changelogURL
+		self.seeMore = seeMore
+		self.released = released
+
+	def __repr__(self) -> str:
+		return "UpgradeCandidate(" + self.manager + ", " + self.name + ", " + self.old + " -> " + self.new + ")"
+
+
+class UpgradeCandidates:
+	"""Column oriented collection of UpgradeCandidate.\n
+	Every field is stored as a list, so counting, filtering and serializing tens of thousands of candidates work on whole columns at once.
+	Iterating or indexing returns UpgradeCandidate copies. Use column() to modify the collection in place"""
+	columnDefaults = {"source": "", "notify": False, "changelog": None, "changelogURL": "", "seeMore": "", "released": None}
+
+	def __init__(self, columns: dict | None = None):
+		columns = columns or {}
+		length = len(columns.get("name", []))
+		self.columns = {column: list(columns[column]) if column in columns else [self.columnDefaults.get(column)] * length for column in UpgradeCandidate.__slots__}
+
+	@classmethod
+	def fromJSON(cls, columns: dict) -> "UpgradeCandidates":
+		return cls(columns)
+
+	def toJSON(self) -> dict:
+		return self.columns
+
+	def __len__(self) -> int:
+		return len(self.columns["name"])
+
+	def __iter__(self):
+		for values in zip(*self.columns.values()):
+			yield UpgradeCandidate(*values)
+
+	def __getitem__(self, index: int) -> UpgradeCandidate:
+		return UpgradeCandidate(*(values[index] for values in self.columns.values()))
+
+	def append(self, candidate: UpgradeCandidate):
+		for column, values in self.columns.items():
+			values.append(getattr(candidate, column))
+
+	def extend(self, candidates: "UpgradeCandidates"):
+		for column, values in self.columns.items():
+			values.extend(candidates.columns[column])
+
+	def column(self, column: str) -> list:
+		"""The list that stores a column. Changing it changes the collection"""
+		return self.columns[column]
+
+	def count(self, column: str) -> dict:
+		"""{value: number of candidates with that value}"""
+		return collections.Counter(self.columns[column])
+
+	def where(self, mask: list[bool]) -> "UpgradeCandidates":
+		"""The candidates whose position in mask is True"""
+		return UpgradeCandidates({column: list(itertools.compress(values, mask)) for column, values in self.columns.items()})
+
+	def slice(self, start: int, stop: int) -> "UpgradeCandidates":
+		"""The candidates from position start up to stop, without looking at the rest"""
+		return UpgradeCandidates({column: values[start:stop] for column, values in self.columns.items()})
+
+	def whereEqual(self, column: str, value) -> "UpgradeCandidates":
+		return self.where([columnValue == value for columnValue in self.columns[column]])
+
 
 
 def stripLeadingV(version):
@@ -84,84 +249,226 @@ def stripLeadingV(version):
 	else:
 		return version
 
-def forceSemver(version: str):
-	"""Recieves a string that should ressemble a semver. This function would convert:
-	\"v3.5\" -> \"3.5.0\"
-	\"3.0\" -> \"3.0.0\""""
-	try:
-		version = semver.VersionInfo.parse(version)
-		return [version, False]
-	except ValueError:
-		#Strip leading v
-		if version.startswith("v"):
-			version = version[1:]
+finalVersionStage = 4
+# Pre-release labels in the order they are released, then the labels of a final release, like "1.0.0.Final". Labels that aren't here count as alpha
+versionStages = {"dev": 0, "snapshot": 0, "nightly": 0, "a": 1, "alpha": 1, "pre": 1, "preview": 1, "b": 2, "beta": 2, "c": 3, "rc": 3, "cr": 3,
+	"final": finalVersionStage, "ga": finalVersionStage, "release": finalVersionStage, "stable": finalVersionStage}
+# Sorts after every dev number, so "1.0" > "1.0.dev5"
+noDevNumber = 2**63
+
+versionPattern = re.compile(r"^[vV]?(?:(\d+)!)?(\d+(?:\.\d+)*)(.*?)(?:\+.*)?$")
+# The tail of a go pseudo-version, like "v0.0.0-20230201184804-2d6232701089" or "v1.2.4-0.20230201184804-2d6232701089"
+goPseudoVersionPattern = re.compile(r"^-(?:.*\.)?(\d{14})-[0-9a-f]{12}$")
+calendarVersionPattern = re.compile(r"^[vV]?(\d{4}|\d{2})\.(\d{1,2})(?:\.(\d{1,2}))?(?![\d])")
+
+@functools.lru_cache(maxsize=65536)
+def compileVersion(version: str) -> tuple | None:
+	"""Compiles a version string into a tuple of ints that sorts like the versions do:\n
+	(epoch, release numbers without trailing zeros, pre-release stage, stage number, post number, dev number)\n
+	Understands semver, 2 and 4 part versions, calver, PEP 440 (\"1!2.0rc1.post2.dev3\"), letter releases (\"1.1.1w\") and go pseudo-versions.
+	EXAMPLE: \"7.1.0.56\" -> (0, (7, 1, 0, 56), 4, 0, -1, noDevNumber)\n
+	Returns None if the version can't be parsed"""
+	match = versionPattern.match(version.strip())
+	if match is None:
+		return None
+
+	epoch = int(match.group(1) or 0)
+	release = [int(number) for number in match.group(2).split(".")]
+	while len(release) > 1 and release[-1] == 0:
+		release.pop()
+
+	stage, stageNumber, post, dev = finalVersionStage, 0, -1, noDevNumber
+	suffix = match.group(3).lower()
+
+	pseudoVersion = goPseudoVersionPattern.match(suffix)
+	if pseudoVersion:
+		# Pseudo-versions are pre-releases of their base version, ordered by commit time
+		return (epoch, tuple(release), versionStages["dev"], int(pseudoVersion.group(1)), post, dev)
+
+	if re.fullmatch(r"[a-z]", suffix):
+		# OpenSSL style letter releases: "1.1.1w" comes after "1.1.1v", which comes after "1.1.1"
+		return (epoch, tuple(release), stage, stageNumber, ord(suffix) - ord("a") + 1, dev)
+
+	tokens = re.findall(r"[a-z]+|\d+", suffix)
+	index = 0
+	while index < len(tokens):
+		token = tokens[index]
+		number = 0
+		if index + 1 < len(tokens) and tokens[index + 1].isdigit():
+			number = int(tokens[index + 1])
+			index += 1
+
+		if token.isdigit():
+			# A bare number after the release, like the \"1\" of \"2.3.1-1\", is a packaging revision
+			post = int(token)
+		elif token in ["post", "rev", "r"]:
+			post = number
+		elif token == "dev":
+			dev = number
+			if stage == finalVersionStage and post == -1:
+				stage = versionStages["dev"]
+		else:
+			stage = versionStages.get(token, versionStages["alpha"])
+			stageNumber = number
+		index += 1
+
+	return (epoch, tuple(release), stage, stageNumber, post, dev)
+
+def isCalendarVersionPair(newVersion: str, oldVersion: str, package: str = "") -> bool:
+	"""True if both versions are dates, like Shotcut's \"23.12.15\" and \"24.02.29\" or \"2023.12.1\" and \"2024.01.0\".\n
+	Two digit years only count if one of the versions has a zero padded month or day, otherwise \"10.2\" or Node's \"20.11.0\" would be dates too.
+	Packages in calendarVersionedPackages always count, which is how pip's \"23.3.2\" and \"24.0\" are told apart from a semver major"""
+	if package.lower() in calendarVersionedPackages:
+		return calendarVersionPattern.match(newVersion) is not None and calendarVersionPattern.match(oldVersion) is not None
+
+	datesLookPadded = False
+	for version in [newVersion, oldVersion]:
+		match = calendarVersionPattern.match(version)
+		if match is None:
+			return False
+
+		year, month, day = match.groups()
+		if int(month) > 12 or (day is not None and int(day) > 31):
+			return False
+		if len(year) == 4:
+			if not 1990 <= int(year) <= 2099:
+				return False
+			datesLookPadded = True
+		elif (len(month) == 2 and month.startswith("0")) or (day is not None and len(day) == 2 and day.startswith("0")):
+			datesLookPadded = True
+
+	return datesLookPadded
+
+def classifyVersionChanges(newVersions: list[str], oldVersions: list[str], packages: list[str] | None = None) -> list[str | None]:
+	"""Compares many version pairs in one call. For every pair returns \"major\", \"minor\" or \"patch\" if the new version is newer, \"\" if it isn't, or None if either of them can't be parsed.\n
+	Calendar versions never count as major upgrades: a new year or month is \"minor\", anything else \"patch\". packages are the names of the pairs, see isCalendarVersionPair"""
+	bumps = []
+	for newVersion, oldVersion, package in zip(newVersions, oldVersions, packages or itertools.repeat("")):
+		newKey = compileVersion(newVersion)
+		oldKey = compileVersion(oldVersion)
+
+		if newKey is None or oldKey is None:
+			bumps.append(None)
+			continue
+		if newKey <= oldKey:
+			bumps.append("")
+			continue
+
+		newRelease = newKey[1] + (0, 0)
+		oldRelease = oldKey[1] + (0, 0)
+		if isCalendarVersionPair(newVersion, oldVersion, package):
+			bumps.append("minor" if newRelease[:2] != oldRelease[:2] else "patch")
+		elif newKey[0] != oldKey[0] or newRelease[0] != oldRelease[0]:
+			bumps.append("major")
+		elif newRelease[1] != oldRelease[1]:
+			bumps.append("minor")
+		else:
+			bumps.append("patch")
+
+	return bumps
+
+def parseVersionsBatch(newVersions: list[str], oldVersions: list[str], packages: list[str], manager: str, source: str = "") -> UpgradeCandidates:
+	"""Receives the raw version strings of many packages of a manager, outputs a fancy message for each upgrade depending on the notificationSettings\n
+	Returns the packages whose new version is newer than the old one"""
+	newVersions = [stripLeadingV(version) for version in newVersions]
+	oldVersions = [stripLeadingV(version) for version in oldVersions]
+	candidates = UpgradeCandidates()
+
+	for newVersion, oldVersion, package, bump in zip(newVersions, oldVersions, packages, classifyVersionChanges(newVersions, oldVersions, packages)):
+		if bump is None:
+			error("Unable to parse the versions of " + colored(package, "yellow") + ": " + colored(oldVersion, "yellow") + " and " + colored(newVersion, "yellow"))
+			continue
+		if bump == "":
+			if devMode:
+				print(package + " " + oldVersion + "==" + newVersion)
+			continue
+
+		if bump == "major":
+			print(colored("NEW MAJOR VERSION: ", colorSettings["Major Versions"]) + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
+		elif bump == "minor":
+			print(colored("New minor version: ", colorSettings["Minor Versions"]) + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
+		else:
+			print("New patch version: " + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
 
-		versionSplit = version.split(".")
-		for index, versionSegment in enumerate(versionSplit):
-			try:
-				number = int(versionSegment)
-				#This is done to deal with the edge case of individual versions having leading ceros and other non-int shenanigans
-				versionSplit[index] = str(number)
-			except ValueError:
-				error("Unable to parse " + colored(version, "yellow") + " as a Semantic Version (See: https://semver.org)")
-				return [None, Exception]
-
-			#Join the version fragments putting a dot between each item
-			version = ".".join(versionSplit)
-		
-		if len(versionSplit) == 2:
-			version = version + ".0"
-			version = semver.VersionInfo.parse(version)
-		elif len(versionSplit) != 3:
-			return [None, Exception]
-	
-	version = semver.VersionInfo.parse(version)
-	return [version, True]
+		candidates.append(UpgradeCandidate(manager, package, oldVersion, newVersion, bump, source, versionNotificationSettings[bump.capitalize() + " Versions"]))
 
-			
+	return candidates
 
-def parseVersions(newVersion: str, oldVersion: str, package: str, manager: str) -> list[bool, bool]:
-	"""Recieves the raw version strings, parses them, outputs a fancy message depending on the notificationSettings\n
-	First bool:  if the newVersion is newer than oldVersion\n
-	Second bool: if newVersion is newer than oldVersion, but depending on the notificationSettings"""
+def parseVersions(newVersion: str, oldVersion: str, package: str, manager: str, source: str = "") -> UpgradeCandidate | None:
+	"""parseVersionsBatch for a single package. Returns an UpgradeCandidate if newVersion is newer than oldVersion, otherwise None"""
+	candidates = parseVersionsBatch([newVersion], [oldVersion], [package], manager, source)
+	return candidates[0] if candidates else None
 
-	global numberOfMajorUpgrades
-	global numberOfMinorUpgrades
-	global numberOfPatchUpgrades
+def getJSON(url: str, headers: dict = {}, maxAge: float | None = 0) -> list:
+	"""GETs a JSON API endpoint and returns [statusCode, parsedJSON]\n
+	Successful responses are kept in responseCache for maxAge seconds. maxAge=None caches them forever, which is meant for things that never change, like the release notes of a published tag"""
+	cached = responseCache.get(url)
+	if cached is not None and (maxAge is None or time.time() - cached[0] < maxAge):
+		return cached[1:]
 
-	newVersion = stripLeadingV(newVersion)
-	oldVersion = stripLeadingV(oldVersion)
+	import requests
 
-	# Parse versions that don't comply with semantic versioning
-	semverNewVersion = forceSemver(newVersion)
-	semverOldVersion = forceSemver(oldVersion)
+	#TODO: Error handling and throttling
+	response = requests.get(url, headers=headers)
+	responseJSON = json.loads(response.text)
 
-	if semverNewVersion[1] == Exception or semverOldVersion[1] == Exception:
-		return [False, False]
-	
-	semverNewVersion = semverNewVersion[0]
-	semverOldVersion = semverOldVersion[0]
+	if response.status_code == 200 and maxAge != 0:
+		responseCache[url] = [time.time(), response.status_code, responseJSON]
 
-	if(semverNewVersion > semverOldVersion):
-		if(semverNewVersion.major > semverOldVersion.major):
-			print(colored("NEW MAJOR VERSION: ", colorSettings["Major Versions"]) + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
-			numberOfMajorUpgrades += 1
-			return [True, versionNotificationSettings["Major Versions"]]
+	if url.startswith("https://api.github.com/") and "X-RateLimit-Remaining" in response.headers:
+		githubQuota["remaining"] = int(response.headers["X-RateLimit-Remaining"])
+		githubQuota["reset"] = int(response.headers.get("X-RateLimit-Reset", 0))
 
-		elif(semverNewVersion.minor > semverOldVersion.minor):
-			print(colored("New minor version: ", colorSettings["Minor Versions"]) + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
-			numberOfMinorUpgrades += 1
-			return [True, versionNotificationSettings["Minor Versions"]]
+	return [response.status_code, responseJSON]
 
-		else:
-			print("New patch version: " + colored("(" + manager + ") ", "yellow") + package + " (" + oldVersion + " to " + newVersion + ")")
-			numberOfPatchUpgrades += 1
-			return [True, versionNotificationSettings["Patch Versions"]]
+def useGitLsRemote() -> bool:
+	"""True if tags should be resolved with git ls-remote instead of the github API: there's no token, or the quota is about to run out"""
+	if githubToken == "":
+		return True
+	if githubQuota["remaining"] is None or time.time() > githubQuota["reset"]:
+		return False
+	if githubQuota["remaining"] >= githubSettings["Minimum API requests left"]:
+		return False
 
-	elif devMode:
-		print(package + " " + oldVersion + "==" + newVersion)
+	if not githubQuota["announced"]:
+		githubQuota["announced"] = True
+		info("Only " + str(githubQuota["remaining"]) + " github API requests left until " + time.strftime("%H:%M", time.localtime(githubQuota["reset"])) + ". Resolving tags with " + colored("git ls-remote", "yellow") + " to save the rest for the changelogs.")
+	return True
 
-	return [False,False]
+def getLatestGitTag(repoURL: str) -> str:
+	"""Returns the highest version tag of a repository with `git ls-remote`, which doesn't need a token nor uses the API quota.\n
+	Pre-release tags are only returned if there's nothing else. Returns an error message if the tags can't be listed"""
+	cached = gitTagCache.get(repoURL)
+	if cached is not None and time.time() - cached[0] < githubSettings["Tag cache minutes"] * 60:
+		return cached[1]
+
+	try:
+		# Never ask for credentials, private repositories just fail
+		result = subprocess.run(["git", "ls-remote", "--tags", "--refs", repoURL], capture_output=True, text=True, timeout=60, env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+	except (OSError, subprocess.TimeoutExpired) as exception:
+		return colored("ERROR: ", "red") + "Unable to run git ls-remote for " + colored(repoURL, "yellow") + ": " + str(exception)
+
+	if result.returncode != 0:
+		return colored("ERROR: ", "red") + "git ls-remote failed for " + colored(repoURL, "yellow") + ": " + result.stderr.strip()
+
+	versions = []
+	for line in result.stdout.splitlines():
+		tag = line.partition("refs/tags/")[2]
+		compiledVersion = compileVersion(tag) if tag else None
+		if compiledVersion is not None:
+			versions.append((compiledVersion[2] == finalVersionStage, compiledVersion, tag))
+
+	if not versions:
+		return colored("ERROR: ", "red") + colored(repoURL, "yellow") + " has no version tags"
+
+	latestTag = max(versions)[2]
+	gitTagCache[repoURL] = [time.time(), latestTag]
+	return latestTag
+
+def resolveLatestGitTags(repoURLs: list[str]) -> list[str]:
+	"""getLatestGitTag for many repositories at the same time"""
+	with concurrent.futures.ThreadPoolExecutor(max_workers=changelogSettings["Parallel downloads"]) as executor:
+		return list(executor.map(getLatestGitTag, repoURLs))
 
 def getLatestGithubRelease(repoURL: urllib.parse.ParseResult | str) -> str:
 
@@ -171,35 +478,32 @@ def getLatestGithubRelease(repoURL: urllib.parse.ParseResult | str) -> str:
 		except:
 			return colored("\tFATAL ERROR [001]: ", "red") + "The github source code URL " + colored(repoURL, "yellow") + " was malformed.\n"
 
+	pathList = (repoURL.path[1:]).split("/") 
+	pathListLen = len(pathList)
 
-	if githubToken != "":
-		pathList = (repoURL.path[1:]).split("/") 
-		pathListLen = len(pathList)
-
-		if pathList[1].endswith(".git"):
-			pathList[1] = (pathList[1])[:-4]
+	if pathList[1].endswith(".git"):
+		pathList[1] = (pathList[1])[:-4]
 
-		#Normally pathListLen would always be equal to 2, but in the rare case where someone put the URL as (for example) "https://github.com/username/repo/", the len will be three, because of that extra slash at the end. This is also done to prevent potential CSRF or token leaks
-		if (pathListLen == 2 or 
-			(pathListLen == 3 and (pathList[2] == "json" or (pathList[2]).startswith("v"))) or  #Idk what this is for
-			(pathListLen == 4 and pathList[3] == "latest")  #Some go packages end with v2, v3, etc. 
-			):
-			#/repos/{owner}/{repo}/releases/latest
-			url = "https://api.github.com/repos/" + pathList[0] + "/" + pathList[1] + "/releases/latest"
+	#Normally pathListLen would always be equal to 2, but in the rare case where someone put the URL as (for example) "https://github.com/username/repo/", the len will be three, because of that extra slash at the end. This is also done to prevent potential CSRF or token leaks
+	if (pathListLen == 2 or 
+		(pathListLen == 3 and (pathList[2] == "json" or (pathList[2]).startswith("v"))) or  #Idk what this is for
+		(pathListLen == 4 and pathList[3] == "latest")  #Some go packages end with v2, v3, etc. 
+		):
+		#/repos/{owner}/{repo}/releases/latest
+		url = "https://api.github.com/repos/" + pathList[0] + "/" + pathList[1] + "/releases/latest"
 
 
-		else:
-			error = colored("\tFATAL ERROR [002]: ", "red") + "The github source code URL " + colored(repoURL, "yellow") + " was malformed.\n"
-			print(error)
-			return error
+	else:
+		error = colored("\tFATAL ERROR [002]: ", "red") + "The github source code URL " + colored(repoURL, "yellow") + " was malformed.\n"
+		print(error)
+		return error
 
+	if useGitLsRemote():
+		return getLatestGitTag("https://github.com/" + pathList[0] + "/" + pathList[1])
 
 	headers = {"Accept": "application/vnd.github+json", "Authorization": "Bearer " + githubToken, "X-GitHub-Api-Version": "2022-11-28"}
-			
-	#TODO: Error handling and throttling
-	response = requests.get(url, headers=headers)
 
-	responseJSON = json.loads(response.text)
+	responseJSON = getJSON(url, headers)[1]
 
 	try:
 		return (responseJSON["tag_name"])
@@ -207,7 +511,69 @@ def getLatestGithubRelease(repoURL: urllib.parse.ParseResult | str) -> str:
 		return colored("ERROR: ", "red") + "This version does not exist: " + colored(url,"yellow")
 
 
+def getCoalesced(cache: dict, statistics: dict, lock: threading.Lock, key, fetch):
+	"""Returns fetch(), running it once for every key: callers asking for a key that is being fetched wait for it, and later ones reuse the result for changelogSettings[\"Cache minutes\"].\n
+	cache is {key: [timeRequested, Future]} and statistics {\"requested\": int, \"fetched\": int}. fetch returns a changelog or [changelog, see more URL].
+	Missing changelogs, errors and exceptions aren't kept, so the next caller tries again"""
+	with lock:
+		statistics["requested"] += 1
+		entry = cache.get(key)
+		isOwner = entry is None or (entry[1].done() and time.time() - entry[0] > changelogSettings["Cache minutes"] * 60)
+		if isOwner:
+			entry = [time.time(), concurrent.futures.Future()]
+			cache[key] = entry
+			statistics["fetched"] += 1
+
+	future = entry[1]
+	if isOwner:
+		try:
+			result = fetch()
+		except BaseException as exception:
+			result = None
+			future.set_exception(exception)
+		else:
+			future.set_result(result)
+
+		changelog = result[0] if isinstance(result, list) else result
+		if changelog is None or isChangelogError(changelog):
+			with lock:
+				if cache.get(key) is entry:
+					del cache[key]
+
+	return future.result()
+
+def getGithubChangelogKey(repoURL: urllib.parse.ParseResult | str, version: str) -> tuple | None:
+	"""Returns (owner, repo, tag) in lowercase, without the \".git\" and the leading v, or None if repoURL isn't a github repo\n
+	EXAMPLE: (\"git+https://github.com/OJ/Gobuster.git\", \"v3.6.0\") -> (\"oj\", \"gobuster\", \"3.6.0\")"""
+	if isinstance(repoURL, urllib.parse.ParseResult):
+		repoURL = urllib.parse.urlunparse(repoURL)
+
+	normalizedURL = getGithubRepoURL(repoURL)
+	if normalizedURL == "":
+		return None
+
+	owner, repo = normalizedURL.split("/")[-2:]
+	return (owner.lower(), repo.lower(), stripLeadingV(version).lower())
+
 def getGithubChangelog(repoURL: urllib.parse.ParseResult | str, version):
+	"""fetchGithubChangelog, but requests for the same repo and tag share a single download, even if they come from different managers or arrive at the same time"""
+	if githubToken == "":
+		return None
+
+	key = getGithubChangelogKey(repoURL, version)
+	if key is None:
+		return fetchGithubChangelog(repoURL, version)
+
+	# Whoever asks first fetches for everyone, so the request can't depend on the shape of their URL, like choco's \"https://github.com/dotnet/core/blob/main/release-notes/...\"
+	normalizedURL = getGithubRepoURL(urllib.parse.urlunparse(repoURL) if isinstance(repoURL, urllib.parse.ParseResult) else repoURL)
+	return getCoalesced(githubChangelogs, githubChangelogStatistics, githubChangelogLock, key, lambda: fetchGithubChangelog(normalizedURL, stripLeadingV(version)))
+
+def resetGithubChangelogs():
+	with githubChangelogLock:
+		githubChangelogs.clear()
+		githubChangelogStatistics.update({"requested": 0, "fetched": 0})
+
+def fetchGithubChangelog(repoURL: urllib.parse.ParseResult | str, version):
 	
 	if githubToken != "":
 		version = stripLeadingV(version)
@@ -245,20 +611,17 @@ def getGithubChangelog(repoURL: urllib.parse.ParseResult | str, version):
 
 
 		headers = {"Accept": "application/vnd.github+json", "Authorization": "Bearer " + githubToken, "X-GitHub-Api-Version": "2022-11-28"}
-		
-		#TODO: Error handling and throttling
-		response = requests.get(url, headers=headers)
 
-		responseJSON = json.loads(response.text)
+		# The release notes of a tag don't change once published
+		responseJSON = getJSON(url, headers, maxAge=None)[1]
 
 		try:
 			return responseJSON["body"]
 		except KeyError:
 			url = "https://api.github.com/repos/" + pathList[0] + "/" + pathList[1] + "/tags"
-			response = requests.get(url, headers=headers)
-			responseJSON = json.loads(response.text)
+			responseJSON = getJSON(url, headers)[1]
 			try:
-				if responseJSON[0]["name"] == version or (forceSemver(responseJSON[0]["name"]))[0] == version:
+				if responseJSON[0]["name"] == version or compileVersion(responseJSON[0]["name"]) == compileVersion(version):
 					return colored("\tWARNING: ", "yellow") + "The repository " + colored(originalRepoURL, "yellow") + " has tags with no releases notes associated to them"
 				else:
 					return colored("\tERROR: ", "red") + colored(originalRepoURL, "yellow") + " has no associated tag/release " + colored(version, "yellow")
@@ -266,22 +629,147 @@ def getGithubChangelog(repoURL: urllib.parse.ParseResult | str, version):
 				return colored("\tERROR: ", "red") + "Unable to get changelog API URL: " + colored(url,"yellow")
 
 
-def fancyChangelogPrint(changelog: str):
+def getGithubReleasesURL(repoURL: urllib.parse.ParseResult | str) -> str:
+	"""Receives any github URL that points inside a repo and returns the URL of its releases page\n
+	EXAMPLE: \"https://github.com/OJ/gobuster/v3\" -> \"https://github.com/OJ/gobuster/releases\""""
+	if not isinstance(repoURL, urllib.parse.ParseResult):
+		repoURL = urllib.parse.urlparse(repoURL)
+
+	pathList = (repoURL.path[1:]).split("/")
+	if len(pathList) < 2:
+		return urllib.parse.urlunparse(repoURL)
+
+	repo = pathList[1]
+	if repo.endswith(".git"):
+		repo = repo[:-4]
+
+	return "https://github.com/" + pathList[0] + "/" + repo + "/releases"
+
+
+def markdownToTerminal(line: str) -> str | None:
+	"""Converts a single line of markdown into plain terminal text.\n
+	Returns None if the line is boilerplate that shouldn't be shown at all"""
+	stripped = line.strip()
+
+	# Horizontal rules and HTML-only lines like <details>, <summary> or <br>
+	if re.fullmatch(r"(-{3,}|\*{3,}|_{3,})", stripped) or re.fullmatch(r"(<[^>]+>\s*)+", stripped):
+		return None
+
+	# Images and badges: ![alt](url) and [![alt](url)](link)
+	line = re.sub(r"\[?!\[[^\]]*\]\([^)]*\)(\]\([^)]*\))?", "", line)
+	if stripped and not line.strip():
+		return None
+
+	# Headers: "## Bug fixes" -> "Bug fixes" in bold
+	header = re.match(r"^\s*#{1,6}\s+(.*)$", line)
+	if header:
+		return colored(header.group(1).strip("# "), attrs=["bold"])
+
+	# Links: [text](url) -> text (url)
+	line = re.sub(r"\[([^\]]+)\]\(([^)\s]+)[^)]*\)", lambda match: match.group(1) if match.group(1) == match.group(2) else match.group(1) + " (" + match.group(2) + ")", line)
+
+	# Bold and inline code
+	line = re.sub(r"(\*\*|__)(.+?)\1", r"\2", line)
+	line = re.sub(r"`([^`]+)`", r"\1", line)
+
+	# Inline HTML tags
+	line = re.sub(r"</?(br|p|b|i|em|strong|sub|sup|details|summary|kbd)\s*/?>", "", line, flags=re.IGNORECASE)
+
+	# Bullet points
+	line = re.sub(r"^(\s*)[*+] ", r"\1- ", line)
+
+	return line.rstrip()
+
+
+def renderChangelog(changelog: str, seeMoreURL: str = "") -> str:
+	"""Renders a changelog into a single string ready to be written to the terminal.\n
+	The changelog is consumed line by line and rendering stops as soon as the limits in changelogSettings are reached,
+	so huge release notes are never fully converted or printed"""
 	changelog = changelog.strip()
-	for line in changelog.splitlines():
-		print("\t| " + line)
-	print("")
+	maxLines = changelogSettings["Max lines"]
+	maxBytes = changelogSettings["Max bytes"]
+
+	output = io.StringIO()
+	writtenLines = 0
+	writtenBytes = 0
+	# Starts as True so leading blank lines are dropped too
+	previousLineWasBlank = True
+	insideComment = False
+	truncatedAt = -1
+
+	start = 0
+	changelogLen = len(changelog)
+	while start < changelogLen:
+		end = changelog.find("\n", start)
+		if end == -1:
+			end = changelogLen
+		lineStart = start
+		line = changelog[start:end].rstrip("\r")
+		start = end + 1
+
+		if changelogSettings["Collapse markdown"]:
+			# Multiline HTML comments, like the ones left behind by release templates
+			if insideComment:
+				if "-->" not in line:
+					continue
+				insideComment = False
+				line = line[line.index("-->") + 3:]
+			line = re.sub(r"<!--.*?-->", "", line)
+			if "<!--" in line:
+				insideComment = True
+				line = line[:line.index("<!--")]
+
+			line = markdownToTerminal(line)
+			if line is None:
+				continue
+
+			# Collapse runs of blank lines into a single one
+			if line.strip() == "":
+				if previousLineWasBlank:
+					continue
+				previousLineWasBlank = True
+			else:
+				previousLineWasBlank = False
+
+		renderedLine = "\t| " + line + "\n"
+		renderedLineBytes = len(renderedLine.encode("utf-8"))
+		if (maxLines and writtenLines >= maxLines) or (maxBytes and writtenBytes + renderedLineBytes > maxBytes):
+			truncatedAt = lineStart
+			if writtenLines == 0 and maxBytes:
+				# A single huge line, like minified release notes. Show as much of it as fits instead of nothing
+				budget = max(maxBytes - len("\t| \n"), 0)
+				output.write("\t| " + line.encode("utf-8")[:budget].decode("utf-8", "ignore") + "\n")
+			break
+
+		output.write(renderedLine)
+		writtenLines += 1
+		writtenBytes += renderedLineBytes
+
+	if truncatedAt != -1:
+		remainingLines = changelog.count("\n", truncatedAt) + 1
+		message = "\t| " + colored("... " + str(remainingLines) + " more lines", "yellow")
+		if seeMoreURL != "":
+			message += colored(". See more: ", "yellow") + seeMoreURL
+		output.write(message + "\n")
+
+	output.write("\n")
+	return output.getvalue()
+
+
+def fancyChangelogPrint(changelog: str, seeMoreURL: str = ""):
+	"""Prints a changelog with a single buffered write. See renderChangelog"""
+	sys.stdout.write(renderChangelog(changelog, seeMoreURL))
+	sys.stdout.flush()
 
 
 def getPypiChangelog(package, newVersion):
 	url = "https://pypi.org/pypi/" + package + "/json"
 
-	#TODO: Error handling and throttling
-	response = requests.get(url)
-	responseJSON = json.loads(response.text)
+	# The source code URL of a project rarely changes, so it's fine to reuse it for a day
+	statusCode, responseJSON = getJSON(url, maxAge=24*60*60)
 
-	if response.status_code != 200:
-		error("Pypi API error. Got status code " + colored(str(response.status_code), "yellow") + " for URL " + colored(url, "yellow"))
+	if statusCode != 200:
+		error("Pypi API error. Got status code " + colored(str(statusCode), "yellow") + " for URL " + colored(url, "yellow"))
 	else:
 		try:
 			sourceCodeURL = responseJSON["info"]["project_urls"]["Source"]
@@ -289,15 +777,15 @@ def getPypiChangelog(package, newVersion):
 			if sourceCodeURL.hostname == "github.com":				
 				return getGithubChangelog(sourceCodeURL, newVersion)
 			else:
-				return "\t" + warning("Unable to fetch changelog for " + colored(package, "yellow") + ". The source code was not hosted on github.")
+				return colored("\tWARNING: ", "yellow") + "Unable to fetch changelog for " + colored(package, "yellow") + ". The source code was not hosted on github."
 
 		except KeyError:
 			#TODO: Add an option to allow the user to fill in the source code site
-			return "\t" + warning("Unable to get source code site for the " + colored(package, "yellow") + " pypi package.")
+			return colored("\tWARNING: ", "yellow") + "Unable to get source code site for the " + colored(package, "yellow") + " pypi package."
 
-def gupCheckForUpgrades(gupOutput):
+def gupCheckForUpgrades(gupOutput) -> UpgradeCandidates:
 	"""gupOutput = The output of \"gup check\""""
-	packages = []
+	packages = UpgradeCandidates()
 
 	for line in gupOutput:
 		line = line.strip()
@@ -308,7 +796,7 @@ def gupCheckForUpgrades(gupOutput):
 			and len(line) != 0):
 
 			if "ERROR" in line:
-				error("Unable to get gup updates")
+				error("Unable to get gup updates: " + line)
 				exit()
 			elif "Already up-to-date" not in line:
 
@@ -321,34 +809,21 @@ def gupCheckForUpgrades(gupOutput):
 				oldVersion = ((re.findall(r"current: .*,", versionList[0]))[0])[9:-1]
 				
 				# If a new version is available...
-				result = parseVersions(newVersion, oldVersion, package, "gup")
-				if result[0]:
-					packages.append(package)
-				
-				if result[1]:
-					if package.startswith("github.com"):
-						
-						changelog = getGithubChangelog("https://" + package, newVersion)
-						if changelog.startswith("\tERROR"):
-							print(changelog)
-						else:
-							fancyChangelogPrint(changelog)
-
-					else:
-						print("You must manually check the release notes for: " + package)
-
-					
+				candidate = parseVersions(newVersion, oldVersion, package, "gup")
+				if candidate is not None:
+					packages.append(candidate)
 
 	return packages
 
 
 # This function receives the output of "pip list --outdated" and a whitelist of which programs to update
-def pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages):
+def pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages, manager = "pip", source = "") -> UpgradeCandidates:
 	"""pipOutput is the output of \"pip list --outdated\"\n
 		pipWhitelistedPackages is the list of packages that will be updated\n
-		This function returns an array of the upgradeable packages
+		manager and source are used to tell apart the packages of a venv from the global ones\n
+		This function returns the upgradeable packages
 		"""
-	upgradeablePackages=[]
+	newVersions, oldVersions, packages = [], [], []
 	for line in pipOutput[2:]:
 		package = re.findall(r"^([^\s]+)", line)
 		package = package[0]
@@ -366,37 +841,22 @@ def pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages):
 			newVersion = newVersion[0]
 			oldVersion = oldVersion[0]
 
-			# If a new version is available...
-			result = parseVersions(newVersion, oldVersion, package, "pip")
-			if result[0]:
-				upgradeablePackages.append(package)
+			newVersions.append(newVersion)
+			oldVersions.append(oldVersion)
+			packages.append(package)
 
-			if result[1]:
-				try:
-					changelog = getPypiChangelog(package, newVersion)
-					if changelog.startswith("\tWARNING"):
-						print(changelog)
-					else:
-						fancyChangelogPrint(changelog)
-				except:
-					# If getPypiChangelog returned an error...
-					continue
-	return upgradeablePackages
+	return parseVersionsBatch(newVersions, oldVersions, packages, manager, source)
 
 
-def pipUpgradeVenvs(pathToVenv, packageToUpgrade):
+def pipUpgradeVenvs(pathToVenv, packageToUpgrade) -> UpgradeCandidates:
 	stream = os.popen("cd " + pathToVenv +"\Scripts & activate & pip list --outdated")
 	pipOutput = stream.readlines()
 	pipWhitelistedPackages = [packageToUpgrade]
-	upgradeable = pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages)
-	if len(upgradeable) == 1:
-		return [pathToVenv, packageToUpgrade]
-	else:
-		return []
+	return pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages, "pipVenvs", pathToVenv)
 
-def checkGitRepoUpgrade(path: str) -> bool:
+def checkGitRepoUpgrade(path: str) -> UpgradeCandidate | None:
 	"""Recieves the folder path of a github cloned repo.\n
-	Returns True if an update is available for the supplied repo"""
+	Returns an UpgradeCandidate if an update is available for the supplied repo"""
 	stream = os.popen("cd " + path + " && git describe --tags")
 	oldVersion = stream.readlines()
 	oldVersion = (oldVersion[0]).strip()
@@ -414,17 +874,8 @@ def checkGitRepoUpgrade(path: str) -> bool:
 	#Normally pathListLen would always be equal to 2, but in the rare case where someone put the URL as (for example) "https://github.com/username/repo/", the len will be three, because of that extra slash at the end. This is also done to prevent potential CSRF or token leaks
 	if pathListLen == 2 or (pathListLen == 3 and pathList[2] == ""):
 		package = pathList[0] + "/" + pathList[1]
-		if githubToken != "":
-			newVersion = getLatestGithubRelease(remote)
-
-			result = parseVersions(newVersion, oldVersion, package, "git")
-			if result[1]:
-				package = pathList[0] + "/" + pathList[1]
-				url = "https://github.com/" + pathList[0] + "/" + pathList[1]
-				changelog = getGithubChangelog(url, newVersion)
-				print(changelog + "\n")
-				
-			return result[0]
+		newVersion = getLatestGithubRelease(remote)
+		return parseVersions(newVersion, oldVersion, package, "git", path)
 
 	else:
 		warning("The github remote URL for " + colored(package, "yellow") + " is in an unsupported format: " + colored(remote, "yellow"))
@@ -464,375 +915,1447 @@ def extractReleaseNotesFromChocoInfo(packageInfo: list[str], titleLineIndex: int
 	return changelog
 
 
-def chocoCheckForUpgrades(chocoOutput: str) -> list[str]:
+def findChocoReleaseNotes(package: str, version: str) -> list:
+	"""Looks for the release notes of a chocolatey package in the output of \"choco info\"\n
+	Returns [found, github URL of the changelog or \"\", release notes from the nuspec or \"\", see more URL]"""
+	stream = os.popen("choco info " + package)
+	packageInfo = stream.readlines()
+
+	seeMoreURL = "https://community.chocolatey.org/packages/" + package + "/" + version
+
+	titles=["Release Notes", " Software Source", "Software Site"]
+
+	for title in titles:
+		title = " " + title +": "
+		for index, packageInfoLine in enumerate(packageInfo):
+			if packageInfoLine.startswith(title):
+				releaseNotesURL = (packageInfoLine[len(title):]).strip()
+				try:
+					releaseNotesURLParsed = urllib.parse.urlparse(releaseNotesURL)
+					if releaseNotesURLParsed.hostname == "github.com":
+						return [True, releaseNotesURL, "", getGithubReleasesURL(releaseNotesURLParsed)]
+				except:
+					pass
+				return [True, "", extractReleaseNotesFromChocoInfo(packageInfo, index), seeMoreURL]
+
+	return [False, "", "", seeMoreURL]
+
+def chocoCheckForUpgrades(chocoOutput: str) -> UpgradeCandidates:
 	"""Receives the raw output of \"choco outdated\""""
 
-	chocoUpgradeablePackages = []
+	newVersions, oldVersions, packages = [], [], []
 
-	chocoOutput = chocoOutput[4:-3]
-	for line in chocoOutput:
-		line = line.split("|")
-		if not line[0].endswith(".install"):
-			try:
-				result = parseVersions(line[2], line[1], line[0], "choco")
-			except IndexError:
-				error("Unable to parse chocolatey output")
-				error(line)
-				exit()
+	rows = [line.split("|") for line in chocoOutput[4:-3]]
+	outdatedPackages = {row[0].lower() for row in rows}
+	for line in rows:
+		# "git.install" is upgraded along with its meta package "git", if that one is installed too
+		if line[0].endswith(".install") and line[0][:-8].lower() in outdatedPackages:
+			continue
+		# Pinned packages are left alone, like `choco upgrade all` does
+		if len(line) > 3 and line[3].strip() == "true":
+			if devMode:
+				print(line[0] + " " + line[1] + " is pinned")
+			continue
 
-			if result[0]:
-				chocoUpgradeablePackages.append(line[0])
-			
-			if result[1]:
-				stream = os.popen("choco info " + line[0])
-				packageInfo = stream.readlines()
-
-				#Found the release notes,  
-				#[True|False,             url|]
-				releaseNotes=[False, ""]
-
-				titles=["Release Notes", " Software Source", "Software Site"]
-
-				for title in titles:
-					# If we haven't found the release notes yet...
-					if not releaseNotes[0]:
-						title = " " + title +": "
-						for index, packageInfoLine in enumerate(packageInfo):
-							if packageInfoLine.startswith(title):
-								releaseNotesURL = (packageInfoLine[len(title):]).strip()
-								try:
-									releaseNotesURLParsed = urllib.parse.urlparse(releaseNotesURL)
-									if releaseNotesURLParsed.hostname == "github.com":
-										releaseNotes[0] = True
-										releaseNotes[1] = getGithubChangelog(releaseNotesURLParsed, line[2])
-									else:
-										releaseNotes[0] = True
-										releaseNotes[1] = extractReleaseNotesFromChocoInfo(packageInfo, index)
-										break
-								except:
-									releaseNotes[0] = True
-									releaseNotes[1] = extractReleaseNotesFromChocoInfo(packageInfo, index)
-								break
-
-				if not releaseNotes[0]:
-					print("\tRelease notes were not included in the nuspec.")
-				else:
-					fancyChangelogPrint(releaseNotes[1])
-
-	return chocoUpgradeablePackages
-
-# def npmIsUpdateAvailable(npmWhitelistedPackages: list[str]) -> list[str]:
-# 	npmOutput = npmOutput.strip()
-# 	npmOutputJSON = json.loads(npmOutput)
-
-# 	if len(npmOutputJSON) == 0:
-# 		return
-
-# 	npmUpgradeablePackages = []
-
-# 	for key in npmOutputJSON.keys():
-# 		package = str(key)
-# 		if package in npmWhitelistedPackages:
-# 			oldVersion = npmOutputJSON[key]["current"]
-# 			newVersion = npmOutputJSON[key]["wanted"]
-
-# 			# Parse versions that don't comply with semantic versioning
-# 			semverNewVersion = forceSemver(newVersion)
-# 			semverOldVersion = forceSemver(oldVersion)
-
-# 			if semverNewVersion[1] == Exception or semverOldVersion[1] == Exception:
-# 				return False
-			
-# 			semverNewVersion = semverNewVersion[0]
-# 			semverOldVersion = semverOldVersion[0]
-
-# 			if(semverNewVersion > semverOldVersion):
-# 				npmUpgradeablePackages.append(package)
-			
-# 			parseVersions(newVersion, oldVersion, package, "npm")
-			
-# 	return npmUpgradeablePackages
-
-def runCommand(command: str):
-	"""Runs a command and prints out its live output"""
-	process = subprocess.Popen(command, stdout=subprocess.PIPE, shell=True)
-	while process.stdout.readable():
-		line = process.stdout.readline()
-		if not line:
+		try:
+			newVersions.append(line[2])
+			oldVersions.append(line[1])
+			packages.append(line[0])
+		except IndexError:
+			error("Unable to parse chocolatey output")
+			error(line)
+			exit()
+
+	return parseVersionsBatch(newVersions, oldVersions, packages, "choco")
+
+def pumpCommandOutput(stream, streamName: str, outputQueue: queue.Queue):
+	"""Reads a pipe of a child process in big chunks and puts the decoded text in outputQueue.\n
+	Puts (streamName, None) in the queue once the pipe is closed"""
+	encoding = commandOutputSettings["Encoding"] or locale.getpreferredencoding(False)
+	decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+	readSize = commandOutputSettings["Read size"]
+
+	while True:
+		chunk = stream.read1(readSize)
+		if not chunk:
 			break
-		print(str(line.strip())[1:])
+		text = decoder.decode(chunk)
+		if text:
+			outputQueue.put((streamName, text))
+
+	text = decoder.decode(b"", final=True)
+	if text:
+		outputQueue.put((streamName, text))
+	outputQueue.put((streamName, None))
+
+
+def runCommand(command: str) -> int:
+	"""Runs a command and prints out its live output. Returns the exit code of the command\n
+	stdout and stderr are read concurrently so the child never blocks on a full pipe, and the output is written in batches every commandOutputSettings[\"Flush interval\"] seconds.
+	If a log file is configured, the output is also appended to it"""
+	process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+
+	outputQueue = queue.Queue()
+	pumps = [threading.Thread(target=pumpCommandOutput, args=(process.stdout, "stdout", outputQueue), daemon=True),
+		threading.Thread(target=pumpCommandOutput, args=(process.stderr, "stderr", outputQueue), daemon=True)]
+	for pump in pumps:
+		pump.start()
+
+	logFilePath = args.log_file or commandOutputSettings["Log file"]
+	logFile = None
+	if logFilePath:
+		logFile = open(logFilePath, "a", encoding="utf-8")
+		logFile.write("$ " + command + "\n")
+
+	flushInterval = commandOutputSettings["Flush interval"]
+	pendingOutput = []
+
+	def flush():
+		if not pendingOutput:
+			return
+		stdoutText = "".join(text for streamName, text in pendingOutput if streamName == "stdout")
+		stderrText = "".join(text for streamName, text in pendingOutput if streamName == "stderr")
+		if stdoutText:
+			sys.stdout.write(stdoutText)
+			sys.stdout.flush()
+		if stderrText:
+			sys.stderr.write(stderrText)
+			sys.stderr.flush()
+		if logFile is not None:
+			logFile.write("".join(text for streamName, text in pendingOutput))
+			logFile.flush()
+		pendingOutput.clear()
+
+	openStreams = len(pumps)
+	lastFlush = time.monotonic()
+	try:
+		while openStreams:
+			try:
+				streamName, text = outputQueue.get(timeout=max(0, flushInterval - (time.monotonic() - lastFlush)))
+				if text is None:
+					openStreams -= 1
+				else:
+					pendingOutput.append((streamName, text))
+			except queue.Empty:
+				pass
+
+			if time.monotonic() - lastFlush >= flushInterval:
+				flush()
+				lastFlush = time.monotonic()
+
+		flush()
+		returnCode = process.wait()
+	finally:
+		if logFile is not None:
+			logFile.close()
+
+	return returnCode
 
-def upgradeGitClone(path: str):
+############################ MANAGER BACKENDS ##########################
+
+def runManagerCommand(command: str, devModeCommand: str) -> int:
+	"""Announces and runs command, or devModeCommand in dev mode. Returns the exit code"""
 	if not devMode:
-		command = "cd " + path + " & git pull"
 		print(colored("Running \"" + command + "\"...", "green"))
+		return runCommand(command)
+
+	print(colored("devMode: ", "yellow") + colored("Running \"" + devModeCommand + "\"...", "green"))
+	return runCommand(devModeCommand)
+
+def printUpgradeResults(results: list[list]):
+	"""results is a list of [candidate, succeeded, seconds, note]. seconds is the time of the whole step the candidate was upgraded in"""
+	if not results:
+		return
+
+	print(colored("Upgrade results:", "green"))
+	for candidate, succeeded, seconds, note in results:
+		status = colored("  OK   ", "green") if succeeded else colored("FAILED ", "red")
+		print("\t" + status + colored("(" + candidate.manager + ") ", "yellow") + candidate.name + " " + candidate.old + " to " + candidate.new + " in " + str(round(seconds, 1)) + "s" + (" (" + note + ")" if note else ""))
+
+	failed = sum(1 for result in results if not result[1])
+	if failed:
+		logFilePath = args.log_file or commandOutputSettings["Log file"]
+		warning(str(failed) + " of " + str(len(results)) + " upgrades failed. Check the output above" + (" or " + colored(logFilePath, "yellow") if logFilePath else "") + ".")
+
+def parseTextTable(output: list[str], columns: list[str]) -> list[dict]:
+	"""Parses the fixed width tables printed by winget and scoop, like:\n
+	Name    Id           Version Available
+	------------------------------------------
+	Firefox Mozilla.Firefox 108.0.1 109.0\n
+	Returns a {header: value} dict for every row. The table ends at the first row that is missing any of columns"""
+	for headerIndex, line in enumerate(output[:-1]):
+		# winget draws a progress spinner with carriage returns before the table
+		header = line.split("\r")[-1].rstrip()
+		separator = output[headerIndex + 1].split("\r")[-1].rstrip()
+		if separator.startswith("-") and all(column in header for column in columns):
+			break
 	else:
-		command = "cd " + path + " & git pull --dry-run"
-		print(colored("devMode: ", "yellow") + colored("Running \"" + command +"\"...", "green"))
-	
-	runCommand(command)
+		return []
 
+	# scoop underlines every column, winget draws a single line under the whole header
+	starts = [match.start() for match in re.finditer(r"-+", separator)]
+	if len(starts) == 1:
+		starts = [match.start() for match in re.finditer(r"\S+", header)]
+	ends = starts[1:] + [None]
+	names = [header[start:end].strip() for start, end in zip(starts, ends)]
+
+	rows = []
+	for line in output[headerIndex + 2:]:
+		line = line.rstrip("\r\n")
+		row = {name: line[start:end].strip() for name, start, end in zip(names, starts, ends)}
+		if not all(row.get(column) for column in columns):
+			break
+		rows.append(row)
 
-############################ END OF FUNCTIONS ##########################
+	return rows
 
-upgradeablePackages = []
+def getGithubRepoURL(url: str) -> str:
+	"""Returns \"https://github.com/owner/repo\" for any URL that points inside a github repo, otherwise \"\"\n
+	EXAMPLE: \"git+https://github.com/npm/cli.git\" -> \"https://github.com/npm/cli\""""
+	url = re.sub(r"^git\+", "", url.strip())
+	url = re.sub(r"^git@github\.com:", "https://github.com/", url)
+	url = re.sub(r"^(git|ssh)://(git@)?", "https://", url)
+	if url.startswith("github:"):
+		url = "https://github.com/" + url[len("github:"):]
 
-# Update gup packages
-if generalUpgradeSettings["gup"]:
-	info("Getting " + colored("gup", "yellow") + " packages...")
-	if not devMode:
-		stream = os.popen("gup check")
-		gupOutput = stream.readlines()
-	else:
-		gupOutput=['gup:INFO : check binary under $GOPATH/bin or $GOBIN\n',
-		'gup:INFO : [ 1/13] golang.org/x/tools/gopls (Already up-to-date: v0.11.0)\n',
-		'gup:INFO : [ 2/13] github.com/OJ/gobuster/v3 (current: v3.4.0, latest: v3.5.0)\n',
-		'gup:INFO : [ 3/13] github.com/haya14busa/goplay (Already up-to-date: v1.0.0)\n',
-		'gup:INFO : [ 4/13] golang.org/dl (Already up-to-date: v0.0.0-20230201184804-2d6232701089)\n',
-		'gup:INFO : [ 5/13] github.com/go-delve/delve (Already up-to-date: v1.20.1)\n',
-		'gup:INFO : [ 6/13] honnef.co/go/tools (current: v0.3.3, latest: v0.4.0)\n',
-		'gup:INFO : [ 7/13] golang.org/dl (Already up-to-date: v0.0.0-20230201184804-2d6232701089)\n',
-		'gup:INFO : [ 8/13] github.com/josharian/impl (current: v1.1.0, latest: v1.2.0)\n',
-		'gup:INFO : [ 9/13] github.com/gwen001/github-subdomains (current: v1.2.0, latest: v1.2.2)\n',
-		'gup:INFO : [10/13] github.com/nao1215/gup (current: v0.15.1, latest: v0.16.0)\n',
-		'gup:INFO : [11/13] github.com/j3ssie/metabigor (Already up-to-date: v1.12.1)\n',
-		'gup:INFO : [12/13] github.com/ossf/criticality_score (Already up-to-date: v1.0.7)\n',
-		'gup:INFO : [13/13] github.com/fatih/gomodifytags (Already up-to-date: v1.16.0)\n',
-		'\n',
-		'gup:INFO : If you want to update binaries, run the following command.\n',
-		'           $ gup update staticcheck.exe impl.exe github-subdomains.exe gup.exe \n']
-
-
-	gupUpgradeablePackages = gupCheckForUpgrades(gupOutput)
-	upgradeablePackages += gupUpgradeablePackages
-
-if generalUpgradeSettings["pip"]:
-	# Update pip packages 
-	pipUpgradeablePackages = []
-
-	info("Getting " + colored("pip", "yellow") + " packages...")
+	try:
+		parsedURL = urllib.parse.urlparse(url)
+	except ValueError:
+		return ""
+
+	pathList = parsedURL.path[1:].split("/")
+	if parsedURL.hostname not in ["github.com", "www.github.com"] or len(pathList) < 2 or pathList[1] == "":
+		return ""
+
+	repo = pathList[1][:-4] if pathList[1].endswith(".git") else pathList[1]
+	return "https://github.com/" + pathList[0] + "/" + repo
+
+
+class ManagerBackend:
+	"""A package manager that fupdate can upgrade. Every backend is registered in managerBackends under the name used in generalUpgradeSettings.\n
+	check() finds the upgrade candidates, by default by parsing the output of discover().
+	prepareMetadata() runs on the machine being upgraded and stores on the candidate whatever only the local package manager knows, like the release notes URL of a chocolatey package.
+	fetchMetadata() returns [changelog or None, see more URL] from the network and may run in any thread, or on the fleet coordinator.
+	planSteps() splits the approved candidates into steps of batchSize candidates (None means all of them at once). batchUpgrade() runs one step and returns its exit code.
+	By default batchUpgrade() calls upgrade() for each candidate and upgrade() calls batchUpgrade() with a single one, so backends override at least one of them.
+	Backends with localReleaseDates find release dates with local commands, so their prepareMetadata() stores them in candidate.released for the coordinator"""
+	name = ""
+	batchSize = None
+	localReleaseDates = False
+	# Exit codes of a successful upgrade: {exit code: note}
+	successExitCodes = {0: ""}
+
+	def discover(self) -> list[str]:
+		"""Returns the raw output of the command that lists the outdated packages"""
+		return []
 
-	if not devMode:
-		stream = os.popen("pip list --outdated")
-		pipOutput = stream.readlines()
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		return UpgradeCandidates()
+
+	def check(self) -> UpgradeCandidates:
+		return self.parse(self.discover())
+
+	def prepareMetadata(self, candidate: UpgradeCandidate):
+		pass
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		return [None, candidate.seeMore]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		"""Returns the timestamp of the release of candidate.new, or None if it can't be known"""
+		return None
+
+	def planSteps(self, candidates: UpgradeCandidates) -> list[UpgradeCandidates]:
+		if not candidates:
+			return []
+		if self.batchSize is None:
+			return [candidates]
+		return [candidates.slice(start, start + self.batchSize) for start in range(0, len(candidates), self.batchSize)]
+
+	def upgrade(self, candidate: UpgradeCandidate) -> int:
+		candidates = UpgradeCandidates()
+		candidates.append(candidate)
+		return self.batchUpgrade(candidates)
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		"""Returns the first exit code that isn't a success, otherwise the last one"""
+		exitCode = 0
+		for candidate in candidates:
+			candidateExitCode = self.upgrade(candidate)
+			if exitCode in self.successExitCodes:
+				exitCode = candidateExitCode
+		return exitCode
+
+
+class GupBackend(ManagerBackend):
+	name = "gup"
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ['gup:INFO : check binary under $GOPATH/bin or $GOBIN\n',
+			'gup:INFO : [ 1/13] golang.org/x/tools/gopls (Already up-to-date: v0.11.0)\n',
+			'gup:INFO : [ 2/13] github.com/OJ/gobuster/v3 (current: v3.4.0, latest: v3.5.0)\n',
+			'gup:INFO : [ 3/13] github.com/haya14busa/goplay (Already up-to-date: v1.0.0)\n',
+			'gup:INFO : [ 4/13] golang.org/dl (Already up-to-date: v0.0.0-20230201184804-2d6232701089)\n',
+			'gup:INFO : [ 5/13] github.com/go-delve/delve (Already up-to-date: v1.20.1)\n',
+			'gup:INFO : [ 6/13] honnef.co/go/tools (current: v0.3.3, latest: v0.4.0)\n',
+			'gup:INFO : [ 7/13] golang.org/dl (Already up-to-date: v0.0.0-20230201184804-2d6232701089)\n',
+			'gup:INFO : [ 8/13] github.com/josharian/impl (current: v1.1.0, latest: v1.2.0)\n',
+			'gup:INFO : [ 9/13] github.com/gwen001/github-subdomains (current: v1.2.0, latest: v1.2.2)\n',
+			'gup:INFO : [10/13] github.com/nao1215/gup (current: v0.15.1, latest: v0.16.0)\n',
+			'gup:INFO : [11/13] github.com/j3ssie/metabigor (Already up-to-date: v1.12.1)\n',
+			'gup:INFO : [12/13] github.com/ossf/criticality_score (Already up-to-date: v1.0.7)\n',
+			'gup:INFO : [13/13] github.com/fatih/gomodifytags (Already up-to-date: v1.16.0)\n',
+			'\n',
+			'gup:INFO : If you want to update binaries, run the following command.\n',
+			'           $ gup update staticcheck.exe impl.exe github-subdomains.exe gup.exe \n']
+
+		return os.popen("gup check").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		return gupCheckForUpgrades(output)
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		if not candidate.name.startswith("github.com"):
+			return ["\tYou must manually check the release notes for: " + candidate.name, ""]
+		return [getGithubChangelog("https://" + candidate.name, candidate.new), getGithubReleasesURL("https://" + candidate.name)]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		if not candidate.name.startswith("github.com/"):
+			return None
+		pathList = candidate.name.split("/")
+		return getGithubReleaseDate(pathList[1] + "/" + pathList[2], candidate.new)
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		return runManagerCommand("gup update", "gup update --dry-run")
+
+
+class PipBackend(ManagerBackend):
+	name = "pip"
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ["Package    Version Latest Type",
+			"---------- ------- ------ -----",
+			"pip_audit    1.1.2   2.4.14 wheel",
+			"minorPackage 2.4.0   2.5.0  wheel",
+			"patchPackage 2.5.0   2.5.1  wheel",
+			"rich         13.0.1  13.2.0 wheel",
+			"setuptools   65.5.0  66.1.1 wheel"]
+
+		return os.popen("pip list --outdated").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		return pipIsUpdateAvailable(output, pipWhitelistedPackages if not devMode else ["pip_audit", "minorPackage", "patchPackage"])
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		return [getPypiChangelog(candidate.name, candidate.new), "https://pypi.org/project/" + candidate.name + "/" + candidate.new + "/"]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		statusCode, responseJSON = getJSON("https://pypi.org/pypi/" + candidate.name + "/" + candidate.new + "/json", maxAge=None)
+		if statusCode == 200 and responseJSON.get("urls"):
+			return parseReleaseDate(responseJSON["urls"][0]["upload_time_iso_8601"][:19] + "Z")
+		return None
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		packages = " ".join(candidates.column("name"))
+		return runManagerCommand("pip install --upgrade " + packages, "pip install --upgrade --dry-run " + packages)
+
+
+class PipVenvBackend(PipBackend):
+	name = "pipVenvs"
+	# Every venv has its own pip
+	batchSize = 1
+
+	def check(self) -> UpgradeCandidates:
+		candidates = UpgradeCandidates()
+		for pathToVenv, packages in pipVenvs.items():
+			for package in packages:
+				candidates.extend(pipUpgradeVenvs(pathToVenv, package))
+		return candidates
+
+	def upgrade(self, candidate: UpgradeCandidate) -> int:
+		activate = "cd " + candidate.source + "\\Scripts & activate & "
+		return runManagerCommand(activate + "pip install --upgrade " + candidate.name, activate + "pip install --upgrade --dry-run " + candidate.name)
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		return ManagerBackend.batchUpgrade(self, candidates)
+
+
+class GitBackend(ManagerBackend):
+	name = "git"
+	batchSize = 1
+
+	def check(self) -> UpgradeCandidates:
+		if useGitLsRemote():
+			# One git ls-remote per repository, all at once. checkGitRepoUpgrade then finds the tags in gitTagCache
+			remotes = [os.popen("cd " + path + " && git config --get remote.origin.url").read().strip() for path in gitRepositories]
+			resolveLatestGitTags([getGithubRepoURL(remote) for remote in remotes if getGithubRepoURL(remote)])
+
+		candidates = UpgradeCandidates()
+		for path in gitRepositories:
+			candidate = checkGitRepoUpgrade(path)
+			if candidate is not None:
+				candidates.append(candidate)
+
+		# Untagged repositories are always pulled, as long as the upgrade policy allows it
+		for path in untaggedGitRepositories:
+			candidates.append(UpgradeCandidate("git", os.path.basename(path), "untagged", "HEAD", "patch", path))
+		return candidates
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		url = "https://github.com/" + candidate.name
+		return [getGithubChangelog(url, candidate.new), getGithubReleasesURL(url)]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		return getGithubReleaseDate(candidate.name, candidate.new)
+
+	def upgrade(self, candidate: UpgradeCandidate) -> int:
+		path = candidate.source
+		exitCode = runManagerCommand("cd " + path + " & git pull", "cd " + path + " & git pull --dry-run")
+		if path in gitPostUpgradeCommands:
+			postUpgradeExitCode = runCommand(gitPostUpgradeCommands[path])
+			exitCode = exitCode or postUpgradeExitCode
+		return exitCode
+
+
+class ChocoBackend(ManagerBackend):
+	name = "choco"
+	# Chocolatey holds a machine wide lock while it installs and most installers can't run next to each other, so packages are upgraded one at a time
+	batchSize = 1
+	successExitCodes = {0: "", 1641: "rebooting", 3010: "reboot required"}
+	localReleaseDates = True
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ["Chocolatey v1.2.1",
+			"Outdated Packages",
+			" Output is package name | current version | available version | pinned?",
+			"",
+			"betterdiscord|1.2.1|1.3.0|false",
+			"scrcpy|2.3.0|2.4.0|false",
+			"Shotcut|23.12.15|24.02.29|false",
+			"shotcut.install|23.12.15|24.02.29|false",
+			"dotnet-7.0-desktopruntime|7.0.1|7.0.2|false",
+			"dotnet-desktopruntime|7.0.1|7.0.2|false",
+			"ds4windows|3.2.6|3.2.7|false",
+			"filezilla|3.62.2|3.63.0|false",
+			"Firefox|108.0.1|109.0|false",
+			"golang|1.19.4|1.19.5|false",
+			"imagemagick|7.1.0.56|7.1.0.57|false",
+			"imagemagick.app|7.1.0.56|7.1.0.58|false",
+			"nextcloud-client|3.6.4|3.6.6|false",
+			"obs-studio|28.1.2|29.0.0|false",
+			"obs-studio.install|28.1.2|29.0.0|false",
+			"openjdk|19.0.1|19.0.2|false",
+			"protonvpn|2.3.1|2.3.2|false",
+			"super-productivity|7.12.0|7.12.1|false",
+			"teamviewer|15.37.3|15.38.3|false",
+			"winscp|5.21.6|5.21.7|false",
+			"winscp.install|5.21.6|5.21.7|false",
+			"7zip.install|22.01|23.01|false",
+			"vlc|3.0.18|3.0.20|true",
+			"wireshark|4.0.2|4.0.3|false",
+			"",
+			"Chocolatey has determined 20 package(s) are outdated.",
+			""]
+
+		return os.popen("choco outdated").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		return chocoCheckForUpgrades(output)
+
+	def prepareMetadata(self, candidate: UpgradeCandidate):
+		found, githubURL, releaseNotes, seeMoreURL = findChocoReleaseNotes(candidate.name, candidate.new)
+		candidate.seeMore = seeMoreURL
+		if not found:
+			candidate.changelog = "\tRelease notes were not included in the nuspec."
+		elif githubURL != "":
+			candidate.changelogURL = githubURL
+		else:
+			candidate.changelog = releaseNotes
+		candidate.released = self.getReleaseDate(candidate)
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		if candidate.changelogURL:
+			return [getGithubChangelog(candidate.changelogURL, candidate.new), candidate.seeMore]
+		return [candidate.changelog, candidate.seeMore]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		# The title line looks like: " Title: Microsoft .NET Desktop Runtime | Published: 2023-11-14"
+		stream = os.popen("choco info " + candidate.name + " --version " + candidate.new)
+		for line in stream.readlines():
+			published = re.search(r"Published: ([0-9/\-.]+)", line)
+			if published:
+				return parseReleaseDate(published.group(1))
+		return None
+
+	def upgrade(self, candidate: UpgradeCandidate) -> int:
+		# Pinning the version that discovery resolved keeps choco from checking every source for the latest one again
+		command = "choco upgrade " + candidate.name + " --version " + candidate.new + " -y --no-progress"
+		return runManagerCommand(command, command + " --noop")
+
+
+class NpmBackend(ManagerBackend):
+	"""Global npm packages. `npm outdated -g` only lists them reliably with --json (https://github.com/npm/cli/issues/6098)"""
+	name = "npm"
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ['{\n',
+			'  "npm": {"current": "9.2.0", "wanted": "10.2.4", "latest": "10.2.4", "location": "C:\\\\Program Files\\\\nodejs\\\\node_modules\\\\npm"},\n',
+			'  "typescript": {"current": "5.2.2", "wanted": "5.3.3", "latest": "5.3.3"},\n',
+			'  "@angular/cli": {"current": "17.0.6", "wanted": "17.0.7", "latest": "17.0.7"}\n',
+			'}\n']
+
+		return os.popen("npm outdated -g --json").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		try:
+			# npm prints nothing at all when everything is up to date
+			outdated = json.loads("".join(output) or "{}")
+		except ValueError:
+			error("Unable to parse the output of " + colored("npm outdated -g --json", "yellow"))
+			return UpgradeCandidates()
+
+		if "error" in outdated:
+			error("npm failed: " + str(outdated["error"].get("summary", outdated["error"])))
+			return UpgradeCandidates()
+
+		packages = [package for package, versions in outdated.items() if "current" in versions and (not npmWhitelistedPackages or package in npmWhitelistedPackages)]
+		return parseVersionsBatch([outdated[package]["latest"] for package in packages], [outdated[package]["current"] for package in packages], packages, "npm")
+
+	def getPackageInfo(self, package: str) -> dict:
+		# Scoped packages like @angular/cli are escaped as @angular%2Fcli
+		statusCode, responseJSON = getJSON("https://registry.npmjs.org/" + package.replace("/", "%2F"), maxAge=24*60*60)
+		return responseJSON if statusCode == 200 else {}
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		seeMoreURL = "https://www.npmjs.com/package/" + candidate.name + "/v/" + candidate.new
+		repository = self.getPackageInfo(candidate.name).get("repository", "")
+		if isinstance(repository, dict):
+			repository = repository.get("url", "")
+
+		repoURL = getGithubRepoURL(repository)
+		if repoURL == "":
+			return [colored("\tWARNING: ", "yellow") + "Unable to fetch changelog for " + colored(candidate.name, "yellow") + ". The source code was not hosted on github.", seeMoreURL]
+		return [getGithubChangelog(repoURL, candidate.new), getGithubReleasesURL(repoURL)]
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		published = self.getPackageInfo(candidate.name).get("time", {}).get(candidate.new)
+		return parseReleaseDate(published[:19] + "Z") if published else None
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		packages = " ".join(name + "@" + version for name, version in zip(candidates.column("name"), candidates.column("new")))
+		return runManagerCommand("npm install -g " + packages, "npm install -g --dry-run " + packages)
+
+
+class ScoopBackend(ManagerBackend):
+	name = "scoop"
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ["Scoop is up to date.\n",
+			"\n",
+			"Name     Installed Version Latest Version Missing Dependencies Info\n",
+			"----     ----------------- -------------- -------------------- ----\n",
+			"7zip     22.01             23.01\n",
+			"ffmpeg   5.1.2             6.1.1\n",
+			"neovim   0.9.4             0.9.5\n",
+			"\n"]
+
+		return os.popen("scoop status").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		rows = parseTextTable(output, ["Name", "Installed Version", "Latest Version"])
+		return parseVersionsBatch([row["Latest Version"] for row in rows], [row["Installed Version"] for row in rows], [row["Name"] for row in rows], "scoop")
+
+	def prepareMetadata(self, candidate: UpgradeCandidate):
+		# `scoop info` prints "Website     : https://github.com/neovim/neovim"
+		for line in os.popen("scoop info " + candidate.name).readlines():
+			name, _, value = line.partition(":")
+			if name.strip() == "Website":
+				candidate.changelogURL = getGithubRepoURL(value)
+				candidate.seeMore = value.strip()
+				break
+
+		if candidate.changelogURL == "":
+			candidate.changelog = "\tYou must manually check the release notes for: " + candidate.name
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		if candidate.changelogURL:
+			return [getGithubChangelog(candidate.changelogURL, candidate.new), getGithubReleasesURL(candidate.changelogURL)]
+		return [candidate.changelog, candidate.seeMore]
+
+	def batchUpgrade(self, candidates: UpgradeCandidates) -> int:
+		# scoop has no dry run
+		packages = " ".join(candidates.column("name"))
+		return runManagerCommand("scoop update " + packages, "scoop status")
+
+
+class WingetBackend(ManagerBackend):
+	name = "winget"
+	batchSize = 1
+	localReleaseDates = True
+
+	def discover(self) -> list[str]:
+		if devMode:
+			return ["Name                       Id                        Version       Available     Source\n",
+			"--------------------------------------------------------------------------------------\n",
+			"Microsoft Edge             Microsoft.Edge            118.0.2088.46 118.0.2088.61 winget\n",
+			"PowerToys (Preview) x64    Microsoft.PowerToys       0.75.1        0.76.0        winget\n",
+			"Git                        Git.Git                   2.42.0.2      2.43.0        winget\n",
+			"3 upgrades available.\n"]
+
+		return os.popen("winget upgrade --accept-source-agreements").readlines()
+
+	def parse(self, output: list[str]) -> UpgradeCandidates:
+		rows = []
+		for row in parseTextTable(output, ["Id", "Version", "Available"]):
+			# winget shortens the columns that don't fit
+			if row["Id"].endswith("…"):
+				warning("winget truncated the id of " + colored(row["Name"], "yellow") + ". Upgrade it manually.")
+			else:
+				rows.append(row)
 
-		pipWhitelistedPackages = ["pip_audit",
-		"safety",
-		"guessit",
-		"srt"]
-	else:
-		pipOutput = ["Package    Version Latest Type",
-		"---------- ------- ------ -----",
-		"pip_audit    1.1.2   2.4.14 wheel",
-		"minorPackage 2.4.0   2.5.0  wheel",
-		"patchPackage 2.5.0   2.5.1  wheel",
-		"rich         13.0.1  13.2.0 wheel",
-		"setuptools   65.5.0  66.1.1 wheel"]
-		pipWhitelistedPackages = ["pip_audit", "minorPackage", "patchPackage"]
-
-	# Check pip upgrades
-	pipUpgradeablePackages = pipIsUpdateAvailable(pipOutput, pipWhitelistedPackages)
-	upgradeablePackages += pipUpgradeablePackages
-
-if generalUpgradeSettings["choco"]:
-	info("Getting " + colored("choco", "yellow") + " packages...")
-	if not devMode:
-		stream = os.popen("choco outdated")
-		chocoOutput = stream.readlines()
+		return parseVersionsBatch([row["Available"] for row in rows], [row["Version"] for row in rows], [row["Id"] for row in rows], "winget")
+
+	def show(self, candidate: UpgradeCandidate) -> list[str]:
+		return os.popen("winget show --id " + candidate.name + " --version " + candidate.new + " --exact --accept-source-agreements").readlines()
+
+	def prepareMetadata(self, candidate: UpgradeCandidate):
+		# `winget show` prints "Release Notes Url: https://..." and an indented "Release Notes:" block
+		lines = self.show(candidate)
+		candidate.released = self.parseReleaseDate(lines)
+		for index, line in enumerate(lines):
+			if line.startswith("Release Notes Url:"):
+				candidate.seeMore = line[len("Release Notes Url:"):].strip()
+			elif line.startswith("Release Notes:"):
+				releaseNotes = itertools.takewhile(lambda releaseNotesLine: releaseNotesLine.startswith(" "), lines[index + 1:])
+				candidate.changelog = "".join(releaseNotesLine.strip() + "\n" for releaseNotesLine in releaseNotes) or None
+
+		candidate.changelogURL = getGithubRepoURL(candidate.seeMore)
+		if candidate.changelogURL == "" and candidate.changelog is None:
+			candidate.changelog = "\tRelease notes were not included in the winget manifest."
+
+	def fetchMetadata(self, candidate: UpgradeCandidate) -> list:
+		if candidate.changelogURL:
+			return [getGithubChangelog(candidate.changelogURL, candidate.new), getGithubReleasesURL(candidate.changelogURL)]
+		return [candidate.changelog, candidate.seeMore]
+
+	def parseReleaseDate(self, lines: list[str]) -> float | None:
+		for line in lines:
+			if line.startswith("Release Date:"):
+				return parseReleaseDate(line[len("Release Date:"):].strip())
+		return None
+
+	def getReleaseDate(self, candidate: UpgradeCandidate) -> float | None:
+		return self.parseReleaseDate(self.show(candidate))
+
+	def upgrade(self, candidate: UpgradeCandidate) -> int:
+		# winget has no dry run, so dev mode only shows the manifest of the new version
+		target = " --id " + candidate.name + " --version " + candidate.new + " --exact"
+		return runManagerCommand("winget upgrade" + target + " --silent --accept-package-agreements --accept-source-agreements", "winget show" + target)
+
+
+# Upgraded in this order
+managerBackends = {backend.name: backend for backend in [GupBackend(), PipBackend(), PipVenvBackend(), GitBackend(), NpmBackend(), ScoopBackend(), WingetBackend(), ChocoBackend()]}
+
+def getEnabledBackends() -> list[ManagerBackend]:
+	return [backend for name, backend in managerBackends.items() if generalUpgradeSettings.get(name)]
+
+############################ DISCOVERY ##########################
+
+def isChangelogError(changelog: str) -> bool:
+	"""The changelog functions return their errors and warnings as text starting with a tab"""
+	return re.sub(r"\x1b\[[0-9;]*m", "", changelog[:20]).startswith("\t")
+
+def getCandidateChangelog(candidate: UpgradeCandidate) -> list:
+	"""Returns [changelog or None, see more URL] for an upgrade candidate of any manager"""
+	backend = managerBackends.get(candidate.manager)
+	if backend is None:
+		return [None, ""]
+
+	try:
+		return backend.fetchMetadata(candidate)
+	except Exception:
+		error("Unable to get the changelog of " + colored(candidate.name, "yellow") + ":\n" + traceback.format_exc())
+		return [None, ""]
+
+def fetchCandidateChangelogs(candidates: list[UpgradeCandidate], fetch = getCandidateChangelog) -> list:
+	"""Runs fetch, which returns [changelog or None, see more URL], for many candidates at the same time. The results are in the same order as candidates"""
+	if not candidates:
+		return []
+	with concurrent.futures.ThreadPoolExecutor(max_workers=changelogSettings["Parallel downloads"]) as executor:
+		return list(executor.map(fetch, candidates))
+
+def printCandidateChangelog(candidate: UpgradeCandidate, changelog: str | None, seeMoreURL: str = ""):
+	if not changelog:
+		return
+
+	print(colored("Changelog of ", "green") + colored("(" + candidate.manager + ") ", "yellow") + candidate.name + " " + candidate.new)
+	if isChangelogError(changelog):
+		print(changelog)
 	else:
-		chocoOutput = ["Chocolatey v1.2.1",
-		"Outdated Packages",
-		" Output is package name | current version | available version | pinned?",
-		"",
-		"betterdiscord|1.2.1|1.3.0|false",
-		"scrcpy|2.3.0|2.4.0|false",
-		"Shotcut|23.12.15|24.02.29|false",
-		"shotcut.install|23.12.15|24.02.29|false",
-		"dotnet-7.0-desktopruntime|7.0.1|7.0.2|false",
-		"dotnet-desktopruntime|7.0.1|7.0.2|false",
-		"ds4windows|3.2.6|3.2.7|false",
-		"filezilla|3.62.2|3.63.0|false",
-		"Firefox|108.0.1|109.0|false",
-		"golang|1.19.4|1.19.5|false",
-		"imagemagick|7.1.0.56|7.1.0.57|false",
-		"imagemagick.app|7.1.0.56|7.1.0.58|false",
-		"nextcloud-client|3.6.4|3.6.6|false",
-		"obs-studio|28.1.2|29.0.0|false",
-		"obs-studio.install|28.1.2|29.0.0|false",
-		"openjdk|19.0.1|19.0.2|false",
-		"protonvpn|2.3.1|2.3.2|false",
-		"super-productivity|7.12.0|7.12.1|false",
-		"teamviewer|15.37.3|15.38.3|false",
-		"winscp|5.21.6|5.21.7|false",
-		"winscp.install|5.21.6|5.21.7|false",
-		"wireshark|4.0.2|4.0.3|false",
-		"",
-		"Chocolatey has determined 18 package(s) are outdated.",
-		""]
-
-	chocoUpgradeablePackages = chocoCheckForUpgrades(chocoOutput)
-	upgradeablePackages += chocoUpgradeablePackages
+		fancyChangelogPrint(changelog, seeMoreURL)
 
-############################################################################################
-#							USER MODIFIYABLE FUNCTIONS BEGIN HERE
-############################################################################################
+def checkBackend(backend: ManagerBackend) -> UpgradeCandidates:
+	"""Finds the upgrades of a backend and prepares the metadata of the ones to notify about. Their changelogs are printed unless fetchChangelogs is False.\n
+	Agents prepare every candidate of backends with localReleaseDates, since the coordinator can't find their release dates for its policy"""
+	info("Getting " + colored(backend.name, "yellow") + " packages...")
+	candidates = backend.check()
 
-if generalUpgradeSettings["pipVenvs"]:
-	pipUpgradeableVenvs = []
-	# Check upgrades for pip virtualenvs
-	safetyUpgrade = pipUpgradeVenvs("C:\Program Files\HackingSoftware\safetyPythonVenv","safety")
-	if len(safetyUpgrade) == 2:
-		pipUpgradeableVenvs.append(safetyUpgrade)
-	upgradeablePackages += pipUpgradeableVenvs
+	prepareAll = not fetchChangelogs and backend.localReleaseDates
+	notifiable = [index for index, notify in enumerate(candidates.column("notify")) if notify or prepareAll]
+	rows = [candidates[index] for index in notifiable]
 
-if generalUpgradeSettings["git"]:
-	# Check upgrades for git repositories
-	githubSearchPath = "C:\\Program Files\\HackingSoftware\\github-search"
-	githubSearch = checkGitRepoUpgrade(githubSearchPath)
+	def prepare(candidate: UpgradeCandidate) -> UpgradeCandidate:
+		try:
+			backend.prepareMetadata(candidate)
+		except Exception:
+			error("Unable to get the metadata of " + colored(candidate.name, "yellow") + ":\n" + traceback.format_exc())
+		return candidate
 
-	grauditPath = "C:\\Program Files\\HackingSoftware\\graudit"
-	graudit = checkGitRepoUpgrade(grauditPath)
+	rows = fetchCandidateChangelogs(rows, prepare)
+	for column in ["changelog", "changelogURL", "seeMore", "released"]:
+		values = candidates.column(column)
+		for index, candidate in zip(notifiable, rows):
+			values[index] = getattr(candidate, column)
 
-	corscannerPath = "C:\\Program Files\\HackingSoftware\\CORScanner"
-	corscanner = checkGitRepoUpgrade(corscannerPath)
+	if fetchChangelogs:
+		for candidate, (changelog, seeMoreURL) in zip(rows, fetchCandidateChangelogs(rows)):
+			printCandidateChangelog(candidate, changelog, seeMoreURL)
 
-	nucleiTemplatesPath = "C:\\Program Files\\HackingSoftware\\nuclei-templates"
-	nucleiTemplates = checkGitRepoUpgrade(nucleiTemplatesPath)
+	return candidates
 
-	sstimapPath = "C:\\Program Files\\HackingSoftware\\SSTImap"
-	sstimap = checkGitRepoUpgrade(sstimapPath)
-	
-	urlessPath = "C:\\Program Files\\HackingSoftware\\urless"
-	urless = checkGitRepoUpgrade(urlessPath)
-
-	wafw00fPath = "C:\\Program Files\\HackingSoftware\\wafw00f"
-	wafw00f = checkGitRepoUpgrade(wafw00fPath)
-
-	if githubSearch:
-		upgradeablePackages.append("githubSearch")
-	if graudit:
-		upgradeablePackages.append("graudit")
-	if corscanner:
-		upgradeablePackages.append("corscanner")
-	if nucleiTemplates:
-		upgradeablePackages.append("nuclei-templates")
-	if sstimap:
-		upgradeablePackages.append("sstimap")
-	if urless:
-		upgradeablePackages.append("urless")
-	if wafw00f:
-		upgradeablePackages.append("wafw00f")
-
-# if generalUpgradeSettings["npm"]:
-# 	npmWhitelistedPackages = ["calculator"]
-# 	npmUpgradeablePackages = npmIsUpdateAvailable(npmWhitelistedPackages)
-# 	upgradeablePackages += npmUpgradeablePackages
-
-
-print("Need to upgrade " + colored(len(upgradeablePackages), "yellow") + " packages.")
-print("\t" + colored(str(numberOfMajorUpgrades) + " MAJOR upgrades", colorSettings["Major Versions"]))
-print("\t" + colored(str(numberOfMinorUpgrades) + " Minor upgrades", colorSettings["Minor Versions"]))
-print("\t" + str(numberOfPatchUpgrades) + " Patch upgrades")
-userWantsToUpdate = (input("Do you want to continue? [Y/n] ")).lower()
-
-if userWantsToUpdate == "" or userWantsToUpdate.startswith("y"):
-	
-	# Upgrade go packages
-	# Putting a list in an if checks if its empty
-	if generalUpgradeSettings["gup"] and gupUpgradeablePackages:
-		if not devMode:
-			print(colored("Running \"gup update\"...", "green"))
-			command = "gup update"
-		else:
-			print(colored("devMode: ", "yellow") + colored("Running \"gup update --dry-run\"...", "green"))
-			command = "gup update --dry-run"
-
-		runCommand(command)
-
-	# Upgrade whitelisted pip packages
-	# Putting a list in an if checks if its empty
-	if generalUpgradeSettings["pip"] and pipUpgradeablePackages:
-		pipUpgradeablePackages = " ".join(pipUpgradeablePackages)
-		if not devMode:
-			command = "pip install --upgrade " + pipUpgradeablePackages
-			print(colored("Running \"" + command + "\"...", "green"))
-		else:
-			command = "pip install --upgrade --dry-run " + pipUpgradeablePackages
-			print(colored("devMode: ", "yellow") + colored("Running \"" + command +"\"...", "green"))
 
-		runCommand(command)
-		
-	# Upgrade python venvs
-	if generalUpgradeSettings["pipVenvs"]:
-		for venv in pipUpgradeableVenvs:
-			pathToVenv = venv[0]
-			package = venv[1]
-
-			if not devMode:
-				command = "cd " + pathToVenv + "\Scripts & activate & pip install --upgrade " + package
-				print(colored("Running \"" + command + "\"...", "green"))
+class OutputRecorder:
+	"""Stand-in for sys.stdout that keeps a copy of everything written to it.\n
+	If echo is False nothing reaches the terminal, which is what --daemon mode wants"""
+	def __init__(self, echo: bool):
+		self.echo = echo
+		self.stream = sys.stdout
+		self.recording = io.StringIO()
+
+	def write(self, text: str) -> int:
+		self.recording.write(text)
+		if self.echo:
+			self.stream.write(text)
+		return len(text)
+
+	def flush(self):
+		if self.echo:
+			self.stream.flush()
+
+	def isatty(self) -> bool:
+		# Keep the colors when recording in the background, so the report looks the same when it's replayed
+		return self.stream.isatty() if self.echo else True
+
+	def getvalue(self) -> str:
+		return self.recording.getvalue()
+
+
+def discoverUpgrades(echo: bool = True) -> dict:
+	"""Checks every enabled package manager and returns the upgrade report:\n
+	{\"created\": timestamp, \"devMode\": bool, \"candidates\": UpgradeCandidates, \"log\": everything that was printed}"""
+	candidates = UpgradeCandidates()
+
+	recorder = OutputRecorder(echo)
+	with contextlib.redirect_stdout(recorder):
+		try:
+			if githubToken == "":
+				warning("No github token detected. Please set the environment variable " + colored("fupdate-github-token", "yellow") + " to your github personal access token. Without it, we can't fetch the changelogs.")
+
+			resetGithubChangelogs()
+			for backend in getEnabledBackends():
+				candidates.extend(checkBackend(backend))
+
+			if githubChangelogStatistics["requested"]:
+				requested, fetched = githubChangelogStatistics["requested"], githubChangelogStatistics["fetched"]
+				info("Github changelogs: " + str(fetched) + " downloaded for " + str(requested) + " requests (" + format(requested / fetched, ".2f") + " requests per download).")
+
+		# The parsers exit() when a package manager fails
+		except (Exception, SystemExit):
+			# Nothing reached the terminal in the background, so show what led to the error
+			if not echo:
+				recorder.stream.write(recorder.getvalue())
+			raise
+
+	return {
+		"created": time.time(),
+		"devMode": devMode,
+		"candidates": candidates,
+		"log": recorder.getvalue()
+	}
+
+############################ UPGRADE REPORT ##########################
+
+def getDataDirectory() -> str:
+	"""Returns the folder where fupdate keeps its files, creating it if needed"""
+	path = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "fupdate")
+	os.makedirs(path, exist_ok=True)
+	return path
+
+def getReportPath() -> str:
+	if args.report:
+		return args.report
+	return os.path.join(getDataDirectory(), "report-dev.json" if devMode else "report.json")
+
+def reportToJSON(report: dict) -> dict:
+	"""Copy of a report or plan that json.dump can handle"""
+	data = dict(report)
+	for key in ["candidates", "rejected"]:
+		if key in data:
+			data[key] = data[key].toJSON()
+	if "steps" in data:
+		data["steps"] = [{"manager": step["manager"], "candidates": step["candidates"].toJSON()} for step in data["steps"]]
+	return data
+
+def reportFromJSON(data: dict) -> dict:
+	report = dict(data)
+	for key in ["candidates", "rejected"]:
+		if key in report:
+			report[key] = UpgradeCandidates.fromJSON(report[key])
+	if "steps" in report:
+		report["steps"] = [{"manager": step["manager"], "candidates": UpgradeCandidates.fromJSON(step["candidates"])} for step in report["steps"]]
+	return report
+
+def saveReport(report: dict):
+	"""Writes the report to a temporary file first, so a run that reads it never sees half of it"""
+	path = getReportPath()
+	with open(path + ".tmp", "w", encoding="utf-8") as reportFile:
+		json.dump(reportToJSON(report), reportFile)
+	os.replace(path + ".tmp", path)
+
+def loadReport() -> dict | None:
+	"""Returns the stored report, or None if there isn't one that is recent enough"""
+	try:
+		with open(getReportPath(), encoding="utf-8") as reportFile:
+			report = reportFromJSON(json.load(reportFile))
+	except (OSError, ValueError, KeyError):
+		return None
+
+	if report.get("devMode") != devMode:
+		return None
+	if time.time() - report.get("created", 0) > scheduleSettings["Report max age minutes"] * 60:
+		return None
+
+	return report
+
+def deleteReport():
+	try:
+		os.remove(getReportPath())
+	except FileNotFoundError:
+		pass
+
+def runDaemon():
+	"""Refreshes the upgrade report forever. Interactive runs pick it up instead of checking everything again"""
+	interval = args.interval if args.interval else scheduleSettings["Refresh interval minutes"]
+	info("Refreshing the upgrade report every " + str(interval) + " minutes. Press CTRL+C to stop.")
+
+	try:
+		while True:
+			try:
+				report = discoverUpgrades(echo=False)
+				saveReport(report)
+				info(time.strftime("%Y-%m-%d %H:%M:%S") + " Found " + str(len(report["candidates"])) + " upgrades. Report saved to " + colored(getReportPath(), "yellow"))
+			# A package manager that fails once, like a `gup check` without network, shouldn't stop the daemon
+			except (Exception, SystemExit):
+				error("Unable to refresh the upgrade report:\n" + traceback.format_exc())
+
+			time.sleep(interval * 60)
+	except KeyboardInterrupt:
+		info("Stopped.")
+
+############################ UPGRADE POLICY ##########################
+
+def loadPolicyFile(path: str):
+	"""Loads a JSON policy file. Its \"upgradePolicySettings\", \"versionNotificationSettings\" and \"generalUpgradeSettings\" keys override the ones at the top of this file"""
+	try:
+		with open(path, encoding="utf-8") as policyFile:
+			policy = json.load(policyFile)
+	except (OSError, ValueError) as exception:
+		error("Unable to load the policy file " + colored(path, "yellow") + ": " + str(exception))
+		exit()
+
+	for key, settings in [("upgradePolicySettings", upgradePolicySettings), ("versionNotificationSettings", versionNotificationSettings), ("generalUpgradeSettings", generalUpgradeSettings)]:
+		if key in policy:
+			settings.update(policy[key])
+
+def compilePatterns(patterns: list[str]) -> re.Pattern | None:
+	"""Turns a list of glob patterns into a single case insensitive regex"""
+	if not patterns:
+		return None
+	return re.compile("|".join("(?:" + fnmatch.translate(pattern) + ")" for pattern in patterns), re.IGNORECASE)
+
+def compileUpgradePolicy(manager: str) -> dict:
+	"""Merges upgradePolicySettings with the overrides of the given manager and precompiles every pattern in it"""
+	settings = dict(upgradePolicySettings)
+	settings.update(upgradePolicySettings["Managers"].get(manager, {}))
+
+	return {
+		"bumps": {
+			"major": settings["Major Versions"],
+			"minor": settings["Minor Versions"],
+			"patch": settings["Patch Versions"]
+		},
+		"allow": compilePatterns(settings["Allow"]),
+		"deny": compilePatterns(settings["Deny"]),
+		"pinned": [(compilePatterns([pattern]), prefix) for pattern, prefix in settings["Pinned"].items()],
+		"minimumAge": settings["Minimum age days"] * 24 * 60 * 60
+	}
+
+def parseReleaseDate(date: str) -> float | None:
+	for dateFormat in ["%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"]:
+		try:
+			return datetime.datetime.strptime(date, dateFormat).replace(tzinfo=datetime.timezone.utc).timestamp()
+		except ValueError:
+			continue
+	return None
+
+def getGithubReleaseDate(repo: str, version: str) -> float | None:
+	"""repo is \"owner/name\". Returns when the release of version was published"""
+	if githubToken == "":
+		return None
+
+	headers = {"Accept": "application/vnd.github+json", "Authorization": "Bearer " + githubToken, "X-GitHub-Api-Version": "2022-11-28"}
+	for tag in ["v" + version, version]:
+		statusCode, responseJSON = getJSON("https://api.github.com/repos/" + repo + "/releases/tags/" + tag, headers, maxAge=None)
+		if statusCode == 200 and responseJSON.get("published_at"):
+			return parseReleaseDate(responseJSON["published_at"])
+	return None
+
+def getReleaseDate(candidate: UpgradeCandidate, remote: bool = False) -> float | None:
+	"""Returns the timestamp of the release of the new version of a candidate, or None if it can't be known.\n
+	remote is True if the candidate was discovered on another machine, whose local release dates can only come from candidate.released"""
+	if candidate.released is not None:
+		return candidate.released
+
+	backend = managerBackends.get(candidate.manager)
+	if backend is None or (remote and backend.localReleaseDates):
+		return None
+	return backend.getReleaseDate(candidate)
+
+def evaluateUpgradePolicy(candidate: UpgradeCandidate, policy: dict, remote: bool = False) -> str:
+	"""Returns an empty string if the candidate can be upgraded, otherwise the reason why it can't"""
+	subjects = [candidate.manager + ":" + candidate.name, candidate.name]
+
+	if policy["deny"] is not None and any(policy["deny"].match(subject) for subject in subjects):
+		return "denied"
+	if policy["allow"] is not None and not any(policy["allow"].match(subject) for subject in subjects):
+		return "not allowed"
+	if not policy["bumps"][candidate.bump]:
+		return candidate.bump + " upgrades are disabled"
+
+	for pattern, prefix in policy["pinned"]:
+		if any(pattern.match(subject) for subject in subjects):
+			if candidate.new != prefix and not candidate.new.startswith(prefix + "."):
+				return "pinned to " + prefix
+
+	if policy["minimumAge"]:
+		# Unattended runs shouldn't gamble on releases of unknown age
+		releaseDate = getReleaseDate(candidate, remote)
+		if releaseDate is None:
+			return "unknown release date"
+		if time.time() - releaseDate < policy["minimumAge"]:
+			return "released less than " + str(round(policy["minimumAge"] / (24 * 60 * 60))) + " days ago"
+
+	return ""
+
+def applyUpgradePolicy(report: dict, messages: list[str] | None = None, remote: bool = False) -> dict:
+	"""Returns a copy of the report whose candidates are the ones approved by the policy. The rejected ones are moved to report[\"rejected\"]\n
+	Why each candidate was rejected is printed, or appended to messages if given. remote is True for candidates discovered on another machine, see getReleaseDate"""
+	candidates = report["candidates"]
+	compiledPolicies = {manager: compileUpgradePolicy(manager) for manager in candidates.count("manager")}
+	approved = []
+
+	for candidate in candidates:
+		reason = evaluateUpgradePolicy(candidate, compiledPolicies[candidate.manager], remote)
+		approved.append(reason == "")
+		if reason != "":
+			message = colored("Policy: ", "yellow") + "skipping " + colored("(" + candidate.manager + ") ", "yellow") + candidate.name + " (" + candidate.old + " to " + candidate.new + "): " + reason
+			if messages is None:
+				print(message)
 			else:
-				command = "cd " + pathToVenv + "\Scripts & activate & pip install --upgrade --dry-run " + package
-				print(colored("devMode: ", "yellow") + colored("Running \"" + command +"\"...", "green"))
+				messages.append(message)
+
+	plan = dict(report)
+	plan["candidates"] = candidates.where(approved)
+	plan["rejected"] = candidates.where([not isApproved for isApproved in approved])
+	return plan
+
+############################ FLEET ##########################
+
+# Coordinator state. Agents POST their candidates to /plan and get back a plan with the changelogs filled in
+# {host: {"received": timestamp, "candidates": [...]}}
+fleetHosts = {}
+# {(manager, package, version): [timeRequested, Future resolving to [changelog, seeMoreURL]]}. Every changelog is fetched once for the whole fleet
+fleetChangelogs = {}
+fleetStatistics = {"requested": 0, "fetched": 0}
+fleetLock = threading.Lock()
+
+def getFleetChangelog(candidate: UpgradeCandidate) -> list:
+	"""getCandidateChangelog, but hosts asking for the same package and version at the same time wait for a single request"""
+	manager = "pip" if candidate.manager == "pipVenvs" else candidate.manager
+	key = (manager, candidate.name.lower(), candidate.new)
+	return getCoalesced(fleetChangelogs, fleetStatistics, fleetLock, key, lambda: getCandidateChangelog(candidate))
+
+def buildHostPlan(submission: dict, applyPolicy: bool) -> dict:
+	"""Receives the discovery results of an agent and returns its plan, with the changelogs of the candidates to notify about"""
+	candidates = UpgradeCandidates.fromJSON(submission["candidates"])
+
+	with fleetLock:
+		fleetHosts[submission["host"]] = {"received": time.time(), "candidates": candidates}
+
+	notifiable = [index for index, notify in enumerate(candidates.column("notify")) if notify]
+	changelogs = fetchCandidateChangelogs([candidates[index] for index in notifiable], getFleetChangelog)
+	for index, (changelog, seeMoreURL) in zip(notifiable, changelogs):
+		candidates.column("changelog")[index] = changelog
+		candidates.column("seeMore")[index] = seeMoreURL
+
+	plan = {
+		"created": time.time(),
+		"devMode": submission.get("devMode", False),
+		"candidates": candidates,
+		"log": ""
+	}
 
-			runCommand(command)
+	if applyPolicy:
+		# The policy decisions are sent to the agent. Hosts are served in parallel, so nothing here may touch sys.stdout
+		messages = []
+		plan = applyUpgradePolicy(plan, messages, remote=True)
+		plan["log"] = "".join(message + "\n" for message in messages)
+
+	return plan
+
+def getFleetReport() -> dict:
+	"""Aggregated view of every host that talked to the coordinator"""
+	with fleetLock:
+		packages = {}
+		for host, submission in fleetHosts.items():
+			candidates = submission["candidates"]
+			for key in zip(candidates.column("manager"), candidates.column("name"), candidates.column("new")):
+				packages.setdefault(key, []).append(host)
+
+		return {
+			"hosts": {host: {"received": submission["received"], "upgrades": len(submission["candidates"])} for host, submission in fleetHosts.items()},
+			"packages": [{"manager": manager, "name": name, "new": version, "hosts": sorted(hosts)} for (manager, name, version), hosts in sorted(packages.items())],
+			"changelogs": dict(fleetStatistics),
+			"githubChangelogs": dict(githubChangelogStatistics)
+		}
+
+class CoordinatorRequestHandler:
+	"""POST /plan with {\"host\", \"devMode\", \"candidates\"} returns the plan of that host. GET /report returns getFleetReport()\n
+	Mixed into http.server.BaseHTTPRequestHandler by createCoordinator, so http.server is only imported by the coordinator"""
+	applyPolicy = False
+
+	def sendJSON(self, statusCode: int, body):
+		encodedBody = json.dumps(body).encode("utf-8")
+		self.send_response(statusCode)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(encodedBody)))
+		self.end_headers()
+		self.wfile.write(encodedBody)
+
+	def do_POST(self):
+		if self.path != "/plan":
+			self.sendJSON(404, {"error": "Not found"})
+			return
 
-	# Upgrade git clones
-	if generalUpgradeSettings["git"]:
-		if githubSearch:
-			upgradeGitClone(githubSearchPath)
-		if graudit:
-			upgradeGitClone(grauditPath)
-		if corscanner:
-			upgradeGitClone(corscannerPath)
+		try:
+			submission = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+			plan = reportToJSON(buildHostPlan(submission, self.applyPolicy))
+			info(str(submission["host"]) + " sent " + str(len(plan["candidates"]["name"]) + len(plan.get("rejected", {}).get("name", []))) + " upgrades. Changelogs: " + str(fleetStatistics["fetched"]) + " fetched for " + str(fleetStatistics["requested"]) + " requests.")
+		# A body like [] or {\"candidates\": 1} fails with any of these
+		except (ValueError, KeyError, TypeError, AttributeError, IndexError) as exception:
+			self.sendJSON(400, {"error": "Malformed submission: " + repr(exception)})
+			return
 
-		# This lazy mf doesn't tag versions for his project
-		upgradeGitClone("C:\\Program Files\\HackingSoftware\\lfimap")
+		self.sendJSON(200, plan)
 
-		if nucleiTemplates:
-			upgradeGitClone(nucleiTemplatesPath)
+	def do_GET(self):
+		if self.path != "/report":
+			self.sendJSON(404, {"error": "Not found"})
+			return
+		self.sendJSON(200, getFleetReport())
 
-		# This lazy mf doesn't tag versions for his project
-		upgradeGitClone("C:\\Program Files\\HackingSoftware\\phpunit-brute")
+	def log_message(self, format, *args):
+		pass
 
-		if sstimap:
-			upgradeGitClone(sstimapPath)
-		
-		if urless:
-			upgradeGitClone(urlessPath)
-
-		if wafw00f:
-			upgradeGitClone(wafw00fPath)
-			runCommand("python " + wafw00fPath + "\\setup.py install")
-
-	# Upgrade chocolatey packages
-	if generalUpgradeSettings["choco"]:
-		if not devMode:
-			command = "choco upgrade all"
-			print(colored("Running \"" + command + "\"...", "green"))
-		else:
-			command = "choco upgrade --noop all"
-			print(colored("devMode: ", "yellow") + colored("Running \"" + command +"\"...", "green"))
+def createCoordinator(address: str, applyPolicy: bool):
+	"""Returns the http.server.ThreadingHTTPServer of the coordinator, ready to serve_forever(). Port 0 picks a free one"""
+	import http.server
 
-		runCommand(command)
+	host, _, port = address.rpartition(":")
+	handler = type("CoordinatorHTTPRequestHandler", (CoordinatorRequestHandler, http.server.BaseHTTPRequestHandler), {"applyPolicy": applyPolicy})
+	return http.server.ThreadingHTTPServer((host or "0.0.0.0", int(port)), handler)
 
-	# # Upgrade npm packages
-	# if generalUpgradeSettings["npm"]:
-	# 	for package in npmUpgradeablePackages:
-	# 		if not devMode:
-	# 			command = "npm update " + package
-	# 			print(colored("Running \"" + command + "\"...", "green"))
-	# 		else:
-	# 			command = "npm update --dry-run " + package
-	# 			print(colored("devMode: ", "yellow") + colored("Running \"" + command +"\"...", "green"))
+def runCoordinator(address: str, applyPolicy: bool):
+	server = createCoordinator(address, applyPolicy)
 
-	# 		runCommand(command)
+	info("Coordinator listening on " + colored(address, "yellow") + ". Agents can connect with " + colored("--agent http://" + address, "yellow") + ". Press CTRL+C to stop.")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		info("Stopped.")
+	finally:
+		server.server_close()
+
+def sendReportToCoordinator(report: dict, coordinatorURL: str) -> dict:
+	"""Sends the discovery results to the coordinator and prints the changelogs it answers with.\n
+	Returns a copy of the report whose candidates are the ones the coordinator approved. The rejected ones are moved to report[\"rejected\"]"""
+	import requests
+
+	submission = {
+		"host": socket.gethostname(),
+		"devMode": devMode,
+		"candidates": report["candidates"].toJSON()
+	}
+
+	info("Sending " + str(len(report["candidates"])) + " upgrades to the coordinator at " + colored(coordinatorURL, "yellow") + "...")
+	try:
+		response = requests.post(coordinatorURL.rstrip("/") + "/plan", json=submission, timeout=600)
+	except requests.RequestException as exception:
+		error("Unable to reach the coordinator: " + str(exception))
+		exit()
+
+	if response.status_code != 200:
+		error("The coordinator answered with status code " + colored(str(response.status_code), "yellow") + ": " + response.text)
+		exit()
+
+	# The upgrade commands run as admin, so nothing but the changelogs and the policy decisions is taken from the coordinator.
+	# The packages, versions and paths that get upgraded are always the ones discovered here
+	try:
+		answer = response.json()
+		approvedKeys = set()
+		remoteCandidates = {}
+		for key, isApproved in [("candidates", True), ("rejected", False)]:
+			if key not in answer:
+				continue
+			columns = answer[key]
+			for manager, name, new, changelog, seeMore in zip(columns["manager"], columns["name"], columns["new"], columns["changelog"], columns["seeMore"]):
+				remoteCandidates[(manager, name, new)] = [changelog if isinstance(changelog, str) else None, seeMore if isinstance(seeMore, str) else ""]
+				if isApproved:
+					approvedKeys.add((manager, name, new))
+	except (ValueError, KeyError, TypeError, AttributeError) as exception:
+		error("The coordinator answered with a malformed plan: " + str(exception))
+		exit()
+
+	candidates = report["candidates"]
+	approved = []
+	for index, candidate in enumerate(candidates):
+		key = (candidate.manager, candidate.name, candidate.new)
+		if key in remoteCandidates:
+			changelog, seeMoreURL = remoteCandidates[key]
+			candidates.column("changelog")[index] = changelog
+			candidates.column("seeMore")[index] = seeMoreURL
+			printCandidateChangelog(candidate, changelog, seeMoreURL)
+
+		approved.append(key in approvedKeys)
+		if key not in approvedKeys:
+			print(colored("Policy: ", "yellow") + "the coordinator skipped " + colored("(" + candidate.manager + ") ", "yellow") + candidate.name + " (" + candidate.old + " to " + candidate.new + ")")
+
+	plan = dict(report)
+	plan["candidates"] = candidates.where(approved)
+	plan["rejected"] = candidates.where([not isApproved for isApproved in approved])
+	return plan
+
+############################ UPGRADE JOURNAL ##########################
+
+# Every upgrade is a transaction of steps, each one a single batchUpgrade() call. The journal is a JSON lines file that is only ever appended to:
+# {"event": "planned", "transaction": id, "time": timestamp, "steps": [{"manager": name, "candidates": columns}]}
+# {"event": "started", "transaction": id, "time": timestamp, "step": index}
+# {"event": "completed", "transaction": id, "time": timestamp, "step": index, "exitCode": int, "succeeded": bool, "seconds": float, "upgrades": [{"manager", "name", "old", "new", "source"}]}
+# {"event": "finished", "transaction": id, "time": timestamp, "succeeded": steps, "failed": steps}
+# Steps that were planned but didn't complete successfully are finished by --resume
+
+def getJournalPath() -> str:
+	return os.path.join(getDataDirectory(), "journal-dev.jsonl" if devMode else "journal.jsonl")
+
+def appendToJournal(entry: dict):
+	"""Appends an entry and flushes it to disk right away, so it survives a crash or a reboot in the middle of the next step"""
+	entry["time"] = time.time()
+	with open(getJournalPath(), "a", encoding="utf-8") as journalFile:
+		journalFile.write(json.dumps(entry) + "\n")
+		journalFile.flush()
+		os.fsync(journalFile.fileno())
+
+def readJournal() -> list[dict]:
+	try:
+		with open(getJournalPath(), encoding="utf-8") as journalFile:
+			lines = journalFile.readlines()
+	except OSError:
+		return []
+
+	entries = []
+	for line in lines:
+		try:
+			entries.append(json.loads(line))
+		except ValueError:
+			# The last line is cut in half if the machine went down while writing it
+			continue
+	return entries
+
+def planUpgradeSteps(candidates: UpgradeCandidates) -> list[dict]:
+	"""[{\"manager\": name, \"candidates\": UpgradeCandidates}] in the order the backends are upgraded"""
+	steps = []
+	for backend in getEnabledBackends():
+		for stepCandidates in backend.planSteps(candidates.whereEqual("manager", backend.name)):
+			steps.append({"manager": backend.name, "candidates": stepCandidates})
+	return steps
+
+def loadUnfinishedTransaction() -> dict | None:
+	"""Returns a plan that finishes the last upgrade, or None if all of its steps succeeded.\n
+	Only the last transaction can be resumed. Starting a new upgrade means the package managers were checked again, so the older plan is stale"""
+	transaction = None
+	for entry in readJournal():
+		if entry["event"] == "planned":
+			transaction = {"transaction": entry["transaction"], "created": entry["time"], "steps": entry["steps"], "succeeded": set()}
+		elif entry["event"] == "completed" and transaction is not None and entry["transaction"] == transaction["transaction"] and entry["succeeded"]:
+			transaction["succeeded"].add(entry["step"])
+
+	if transaction is None:
+		return None
+
+	remaining = [index for index in range(len(transaction["steps"])) if index not in transaction["succeeded"]]
+	if not remaining:
+		return None
+
+	plan = reportFromJSON({
+		"created": transaction["created"],
+		"devMode": devMode,
+		"transaction": transaction["transaction"],
+		"steps": transaction["steps"],
+		"remaining": remaining,
+		"log": ""
+	})
+	plan["candidates"] = UpgradeCandidates()
+	for index in remaining:
+		plan["candidates"].extend(plan["steps"][index]["candidates"])
+	return plan
+
+############################ UPGRADE ##########################
+
+def printUpgradeSummary(report: dict):
+	counters = report["candidates"].count("bump")
+	print("Need to upgrade " + colored(len(report["candidates"]), "yellow") + " packages.")
+	print("\t" + colored(str(counters["major"]) + " MAJOR upgrades", colorSettings["Major Versions"]))
+	print("\t" + colored(str(counters["minor"]) + " Minor upgrades", colorSettings["Minor Versions"]))
+	print("\t" + str(counters["patch"]) + " Patch upgrades")
+
+def upgradePackages(plan: dict):
+	"""Upgrades the candidates of the plan, journaling every step. Plans returned by loadUnfinishedTransaction only run their remaining steps"""
+	if "transaction" in plan:
+		transaction = plan["transaction"]
+		steps = plan["steps"]
+		remaining = plan["remaining"]
+	else:
+		transaction = datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + str(os.getpid())
+		steps = planUpgradeSteps(plan["candidates"])
+		remaining = range(len(steps))
+		appendToJournal({"event": "planned", "transaction": transaction, "steps": reportToJSON({"steps": steps})["steps"]})
+
+	results = []
+	stepsSucceeded = []
+	try:
+		for index in remaining:
+			step = steps[index]
+			backend = managerBackends[step["manager"]]
+			candidates = step["candidates"]
+
+			appendToJournal({"event": "started", "transaction": transaction, "step": index})
+			started = time.monotonic()
+			exitCode = backend.batchUpgrade(candidates)
+			seconds = time.monotonic() - started
+			succeeded = exitCode in backend.successExitCodes
+
+			upgrades = [{"manager": candidate.manager, "name": candidate.name, "old": candidate.old, "new": candidate.new, "source": candidate.source} for candidate in candidates]
+			appendToJournal({"event": "completed", "transaction": transaction, "step": index, "exitCode": exitCode, "succeeded": succeeded, "seconds": seconds, "upgrades": upgrades})
+
+			stepsSucceeded.append(succeeded)
+			note = backend.successExitCodes.get(exitCode, "exit code " + str(exitCode))
+			results.extend([candidate, succeeded, seconds, note] for candidate in candidates)
+
+	except KeyboardInterrupt:
+		printUpgradeResults(results)
+		warning("Upgrade interrupted. Run with " + colored("--resume", "yellow") + " to finish it.")
+		exit()
+
+	failedSteps = stepsSucceeded.count(False)
+	appendToJournal({"event": "finished", "transaction": transaction, "succeeded": len(stepsSucceeded) - failedSteps, "failed": failedSteps})
+	printUpgradeResults(results)
+	if failedSteps:
+		info("Run with " + colored("--resume", "yellow") + " to retry the failed steps.")
+
+def requestAdminPrivileges(plan: dict) -> bool:
+	"""Returns True if this process is admin and can go on upgrading.\n
+	Otherwise the plan is saved and handed over to an elevated copy of fupdate, so discovery doesn't run twice. In that case this returns False once the elevated copy is done"""
+	#https://gist.github.com/sylvainpelissier/ff072a6759082590a4fe8f7e070a4952
+	import pyuac
+
+	if pyuac.isUserAdmin():
+		return True
+
+	if os.name != "nt":
+		error("Admin privileges are needed to upgrade packages!")
+		exit()
+
+	planPath = os.path.join(getDataDirectory(), "plan.json")
+	with open(planPath, "w", encoding="utf-8") as planFile:
+		json.dump(reportToJSON(plan), planFile)
+
+	# The elevated process starts in System32, so relative paths would point there
+	arguments = ["--plan", planPath]
+	logFilePath = args.log_file or commandOutputSettings["Log file"]
+	if logFilePath:
+		arguments += ["--log-file", os.path.abspath(logFilePath)]
+	if args.report:
+		arguments += ["--report", os.path.abspath(args.report)]
+	if devMode:
+		arguments.append("--dev-mode")
+	if args.yes or args.policy is not None:
+		# The policy was already applied to the plan. This only tells the elevated process not to wait for the user
+		arguments.append("--yes")
+
+	info("Asking for admin privileges to upgrade...")
+	try:
+		pyuac.runAsAdmin([sys.executable, os.path.abspath(__file__)] + arguments)
+	except ImportError:
+		error("Asking for admin privileges needs pywin32: " + colored("pip install pywin32", "yellow"))
+		os.remove(planPath)
+	except Exception as exception:
+		# ShellExecuteEx raises if the user says no to the UAC prompt
+		error("Admin privileges were not granted: " + str(exception))
+		os.remove(planPath)
+	return False
+
+def finishUpgrade(plan: dict):
+	upgradePackages(plan)
+
+	# Everything in the report was just upgraded
+	deleteReport()
 
 	print(colored("==================================================", "green"))
 	print(colored("                      ALL DONE!                   ", "green"))
 	print(colored("==================================================", "green"))
 
-else:
-	print(colored("==================================================", "yellow"))
-	print(colored("                 UPGRADE CANCELED                 ", "yellow"))
-	print(colored("==================================================", "yellow"))
\ No newline at end of file
+def main():
+	# Started by requestAdminPrivileges with an already computed plan
+	if args.plan:
+		import pyuac
+		if not pyuac.isUserAdmin():
+			error("Admin privileges are needed!")
+			exit()
+
+		with open(args.plan, encoding="utf-8") as planFile:
+			plan = reportFromJSON(json.load(planFile))
+		os.remove(args.plan)
+
+		finishUpgrade(plan)
+		# The elevated process runs in its own window, which would close before the results could be read
+		if not args.yes:
+			input("Press Enter to exit.")
+		return
+
+	if args.resume:
+		plan = loadUnfinishedTransaction()
+		if plan is None:
+			info("There is no unfinished upgrade to resume.")
+			return
+
+		info("Resuming the upgrade from " + str(round((time.time() - plan["created"]) / 60)) + " minutes ago: " + str(len(plan["remaining"])) + " of " + str(len(plan["steps"])) + " steps left.")
+		printUpgradeSummary(plan)
+		if requestAdminPrivileges(plan):
+			finishUpgrade(plan)
+		return
+
+	if args.policy:
+		loadPolicyFile(args.policy)
+	unattended = args.yes or args.policy is not None
+
+	if args.daemon:
+		runDaemon()
+		return
+
+	if args.coordinator:
+		runCoordinator(args.coordinator, unattended)
+		return
+
+	if args.agent:
+		global fetchChangelogs
+		fetchChangelogs = False
+		report = sendReportToCoordinator(discoverUpgrades(), args.agent)
+	else:
+		report = None if args.refresh else loadReport()
+		if report is not None:
+			info("Using the upgrade report from " + str(round((time.time() - report["created"]) / 60)) + " minutes ago. Run with " + colored("--refresh", "yellow") + " to check every package manager again.")
+			sys.stdout.write(report["log"])
+		else:
+			report = discoverUpgrades()
+			saveReport(report)
+
+	printUpgradeSummary(report)
+	if args.check_only:
+		return
+
+	if unattended:
+		report = applyUpgradePolicy(report)
+		info("Upgrading " + colored(len(report["candidates"]), "yellow") + " packages allowed by the policy.")
+		userWantsToUpdate = "y"
+	else:
+		userWantsToUpdate = (input("Do you want to continue? [Y/n] ")).lower()
+
+	if userWantsToUpdate == "" or userWantsToUpdate.startswith("y"):
+		if requestAdminPrivileges(report):
+			finishUpgrade(report)
+
+	else:
+		print(colored("==================================================", "yellow"))
+		print(colored("                 UPGRADE CANCELED                 ", "yellow"))
+		print(colored("==================================================", "yellow"))
+
+############################################################################################
+#							USER MODIFIYABLE SETTINGS BEGIN HERE
+############################################################################################
+
+pipWhitelistedPackages = ["pip_audit",
+	"safety",
+	"guessit",
+	"srt"]
+
+# Packages whose versions start with a year but don't zero pad the month, like pip's "24.0". Lowercase.
+# They never count as major upgrades. Versions like "2024.1.0" or "23.12.15" are recognized without being here
+calendarVersionedPackages = ["pip", "black", "attrs", "pyopenssl", "twisted"]
+
+# Global npm packages to upgrade. Leave empty to upgrade all of them
+npmWhitelistedPackages = []
+
+# {path to the venv: [packages to upgrade inside of it]}
+pipVenvs = {
+	"C:\\Program Files\\HackingSoftware\\safetyPythonVenv": ["safety"]
+}
+
+# Repositories cloned with `git clone`. They're upgraded when a newer github release is available
+gitRepositories = [
+	"C:\\Program Files\\HackingSoftware\\github-search",
+	"C:\\Program Files\\HackingSoftware\\graudit",
+	"C:\\Program Files\\HackingSoftware\\CORScanner",
+	"C:\\Program Files\\HackingSoftware\\nuclei-templates",
+	"C:\\Program Files\\HackingSoftware\\SSTImap",
+	"C:\\Program Files\\HackingSoftware\\urless",
+	"C:\\Program Files\\HackingSoftware\\wafw00f"
+]
+
+# These lazy mfs don't tag versions for their projects, so they're always pulled
+untaggedGitRepositories = [
+	"C:\\Program Files\\HackingSoftware\\lfimap",
+	"C:\\Program Files\\HackingSoftware\\phpunit-brute"
+]
+
+# {path of a git clone: command to run after pulling it}
+gitPostUpgradeCommands = {
+	"C:\\Program Files\\HackingSoftware\\wafw00f": "python C:\\Program Files\\HackingSoftware\\wafw00f\\setup.py install"
+}
+
+if __name__ == "__main__":
+	main()
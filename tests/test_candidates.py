@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fupdate
+
+def makeCandidates(count: int) -> fupdate.UpgradeCandidates:
+	candidates = fupdate.UpgradeCandidates()
+	for index in range(count):
+		candidates.append(fupdate.UpgradeCandidate("choco", "package" + str(index), "1.0", "1.1", "minor"))
+	return candidates
+
+def testSlice():
+	candidates = makeCandidates(5)
+	assert candidates.slice(1, 3).column("name") == ["package1", "package2"]
+	assert candidates.slice(4, 10).column("name") == ["package4"]
+	assert len(candidates.slice(5, 10)) == 0
+
+def testPlanStepsSplitsTheCandidatesInBatches():
+	backend = fupdate.ManagerBackend()
+	candidates = makeCandidates(7)
+	assert backend.planSteps(fupdate.UpgradeCandidates()) == []
+	assert [step.column("name") for step in backend.planSteps(candidates)] == [candidates.column("name")]
+
+	backend.batchSize = 3
+	assert [len(step) for step in backend.planSteps(candidates)] == [3, 3, 1]
+	assert sum((step.column("name") for step in backend.planSteps(candidates)), []) == candidates.column("name")
+
+def testPlanStepsIsLinear():
+	candidates = makeCandidates(20000)
+	start = time.perf_counter()
+	steps = fupdate.managerBackends["choco"].planSteps(candidates)
+	assert len(steps) == 20000
+	assert time.perf_counter() - start < 2
+
+def testChocoSkipsPinnedPackagesAndMetaPackageInstallers():
+	output = ["Chocolatey v1.2.1", "Outdated Packages", " Output is package name | current version | available version | pinned?", "",
+		"git|2.40.0|2.41.0|false",
+		"git.install|2.40.0|2.41.0|false",
+		"7zip.install|22.01|23.01|false",
+		"vlc|3.0.18|3.0.20|true",
+		"", "Chocolatey has determined 4 package(s) are outdated.", ""]
+	assert fupdate.chocoCheckForUpgrades(output).column("name") == ["git", "7zip.install"]
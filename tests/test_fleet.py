@@ -0,0 +1,188 @@
+"""Runs a coordinator and its agents on this machine over local HTTP. The upstream changelog sources are replaced by a counter"""
+import os
+import sys
+import json
+import threading
+import http.server
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fupdate
+
+def startServer(server) -> str:
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return "http://127.0.0.1:" + str(server.server_address[1])
+
+def makeReport() -> dict:
+	candidates = fupdate.UpgradeCandidates()
+	candidates.append(fupdate.UpgradeCandidate("choco", "git", "2.40.0", "2.41.0", "minor", "", True))
+	candidates.append(fupdate.UpgradeCandidate("pip", "srt", "3.5.2", "3.5.3", "patch", "", True))
+	candidates.append(fupdate.UpgradeCandidate("pipVenvs", "SRT", "3.5.2", "3.5.3", "patch", "C:\\venv", True))
+	candidates.append(fupdate.UpgradeCandidate("git", "lfimap", "untagged", "HEAD", "patch", "C:\\lfimap"))
+	return {"created": 0, "devMode": False, "candidates": candidates, "log": ""}
+
+@pytest.fixture
+def upstream(monkeypatch):
+	"""Stands in for github and pypi. Returns the list of changelogs that were downloaded"""
+	downloads = []
+	lock = threading.Lock()
+
+	def getCandidateChangelog(candidate: fupdate.UpgradeCandidate) -> list:
+		with lock:
+			downloads.append((candidate.manager, candidate.name, candidate.new))
+		return ["## " + candidate.name + " " + candidate.new + "\n* Fixed a bug", "https://example.com/" + candidate.name]
+
+	monkeypatch.setattr(fupdate, "getCandidateChangelog", getCandidateChangelog)
+	monkeypatch.setitem(fupdate.upgradePolicySettings, "Deny", [])
+	fupdate.fleetHosts.clear()
+	fupdate.fleetChangelogs.clear()
+	fupdate.fleetStatistics.update({"requested": 0, "fetched": 0})
+	return downloads
+
+@pytest.fixture
+def coordinator(upstream):
+	server = fupdate.createCoordinator("127.0.0.1:0", applyPolicy=True)
+	yield startServer(server)
+	server.shutdown()
+	server.server_close()
+
+def testEveryChangelogIsDownloadedOnceForTheWholeFleet(coordinator, upstream):
+	plans = []
+	agents = [threading.Thread(target=lambda: plans.append(fupdate.sendReportToCoordinator(makeReport(), coordinator))) for _ in range(4)]
+	for agent in agents:
+		agent.start()
+	for agent in agents:
+		agent.join()
+
+	# pip and pipVenvs share the changelogs of pypi, and names are case insensitive
+	assert sorted(upstream) == [("choco", "git", "2.41.0"), ("pip", "srt", "3.5.3")]
+	assert fupdate.fleetStatistics == {"requested": 12, "fetched": 2}
+
+	assert len(plans) == 4
+	for plan in plans:
+		assert plan["candidates"].column("name") == ["git", "srt", "SRT", "lfimap"]
+		assert plan["candidates"].column("changelog")[0] == "## git 2.41.0\n* Fixed a bug"
+		assert plan["candidates"].column("seeMore")[1] == "https://example.com/srt"
+		assert len(plan["rejected"]) == 0
+
+	report = requests.get(coordinator + "/report").json()
+	assert report["changelogs"] == {"requested": 12, "fetched": 2}
+	assert {package["name"] for package in report["packages"]} == {"git", "srt", "SRT", "lfimap"}
+
+def testTheCoordinatorPolicyRejectsCandidates(coordinator, monkeypatch):
+	monkeypatch.setitem(fupdate.upgradePolicySettings, "Deny", ["git:*"])
+	plan = fupdate.sendReportToCoordinator(makeReport(), coordinator)
+
+	assert plan["candidates"].column("name") == ["git", "srt", "SRT"]
+	assert plan["rejected"].column("name") == ["lfimap"]
+
+def testMalformedSubmissionsGetA400(coordinator):
+	for body in [[], {"host": "a"}, {"host": "a", "candidates": 1}, {"host": "a", "candidates": {"name": 1}}]:
+		response = requests.post(coordinator + "/plan", json=body)
+		assert response.status_code == 400, body
+
+	assert requests.post(coordinator + "/plan", data="not json").status_code == 400
+
+def testErrorsAreNotSharedAndChangelogsExpire(upstream, monkeypatch):
+	candidate = fupdate.UpgradeCandidate("pip", "srt", "3.5.2", "3.5.3", "patch", "", True)
+	monkeypatch.setattr(fupdate, "getCandidateChangelog", lambda candidate: (upstream.append(candidate.name), ["\tERROR: API rate limit exceeded", ""])[1])
+	fupdate.getFleetChangelog(candidate)
+	fupdate.getFleetChangelog(candidate)
+	assert len(upstream) == 2
+
+	monkeypatch.setattr(fupdate, "getCandidateChangelog", lambda candidate: (upstream.append(candidate.name), ["* Fixed a bug", ""])[1])
+	fupdate.getFleetChangelog(candidate)
+	fupdate.getFleetChangelog(candidate)
+	assert len(upstream) == 3
+
+	monkeypatch.setitem(fupdate.changelogSettings, "Cache minutes", 0)
+	fupdate.getFleetChangelog(candidate)
+	assert len(upstream) == 4
+
+def testAgentsOnlyUpgradeWhatTheyDiscovered(upstream):
+	"""A coordinator, or anyone between it and the agent, can't make the agent run commands"""
+	injected = fupdate.UpgradeCandidates()
+	injected.append(fupdate.UpgradeCandidate("choco", "git & calc.exe", "2.40.0", "2.41.0", "minor", "", True, "injected"))
+	injected.append(fupdate.UpgradeCandidate("choco", "git", "2.40.0", "2.41.0", "minor", "C:\\ & calc.exe", True, "* Fixed a bug"))
+	injected.append(fupdate.UpgradeCandidate("pip", "srt", "3.5.2", "3.5.3", "patch", "", True, ["not", "a", "changelog"]))
+
+	class MaliciousCoordinator(http.server.BaseHTTPRequestHandler):
+		def do_POST(self):
+			self.rfile.read(int(self.headers["Content-Length"]))
+			body = json.dumps({"candidates": injected.toJSON(), "log": "\x1b[2J"}).encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format, *args):
+			pass
+
+	server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MaliciousCoordinator)
+	try:
+		plan = fupdate.sendReportToCoordinator(makeReport(), startServer(server))
+	finally:
+		server.shutdown()
+		server.server_close()
+
+	local = makeReport()["candidates"]
+	assert plan["candidates"].column("name") == ["git", "srt"]
+	assert plan["candidates"].column("source") == ["", ""]
+	assert plan["candidates"].column("changelog") == ["* Fixed a bug", None]
+	assert plan["rejected"].column("name") == ["SRT", "lfimap"]
+	assert sorted(plan["candidates"].column("name") + plan["rejected"].column("name")) == sorted(local.column("name"))
+
+def testParallelHostsDontShareTheirOutput(coordinator, monkeypatch):
+	"""Policy decisions go into the plan of their own host, never through sys.stdout"""
+	monkeypatch.setitem(fupdate.upgradePolicySettings, "Deny", ["git:*"])
+	stdout = sys.stdout
+	answers = []
+
+	def post(host: int):
+		submission = {"host": "host" + str(host), "devMode": False, "candidates": makeReport()["candidates"].toJSON()}
+		answers.append(requests.post(coordinator + "/plan", json=submission).json())
+
+	hosts = [threading.Thread(target=post, args=(host,)) for host in range(8)]
+	for host in hosts:
+		host.start()
+	for host in hosts:
+		host.join()
+
+	assert sys.stdout is stdout
+	assert len(answers) == 8
+	for answer in answers:
+		assert answer["log"].count("Policy: ") == 1
+		assert "lfimap" in answer["log"]
+
+def testTheCoordinatorUsesTheReleaseDatesOfTheAgents(coordinator, monkeypatch):
+	"""choco and winget release dates come from local commands, which only the agent can run"""
+	def getLocalReleaseDate(self, candidate):
+		raise AssertionError("the coordinator ran a local command for " + candidate.name)
+
+	monkeypatch.setattr(fupdate.ChocoBackend, "getReleaseDate", getLocalReleaseDate)
+	monkeypatch.setattr(fupdate.WingetBackend, "getReleaseDate", getLocalReleaseDate)
+	monkeypatch.setitem(fupdate.upgradePolicySettings, "Minimum age days", 7)
+
+	candidates = fupdate.UpgradeCandidates()
+	candidates.append(fupdate.UpgradeCandidate("choco", "git", "2.40.0", "2.41.0", "minor", released=0.0))
+	candidates.append(fupdate.UpgradeCandidate("winget", "Git.Git", "2.40.0", "2.41.0", "minor", released=fupdate.time.time()))
+	candidates.append(fupdate.UpgradeCandidate("choco", "7zip", "22.01", "23.01", "minor"))
+	submission = {"host": "agent", "devMode": False, "candidates": candidates.toJSON()}
+	answer = requests.post(coordinator + "/plan", json=submission).json()
+
+	assert answer["candidates"]["name"] == ["git"]
+	assert answer["rejected"]["name"] == ["Git.Git", "7zip"]
+	assert "released less than 7 days ago" in answer["log"]
+	assert "unknown release date" in answer["log"]
+
+def testAgentsResolveLocalReleaseDates(monkeypatch):
+	monkeypatch.setattr(fupdate, "fetchChangelogs", False)
+	monkeypatch.setattr(fupdate, "devMode", True)
+	monkeypatch.setattr(fupdate, "findChocoReleaseNotes", lambda package, version: [False, "", "", ""])
+	monkeypatch.setattr(fupdate.ChocoBackend, "getReleaseDate", lambda self, candidate: 1700000000.0)
+
+	candidates = fupdate.checkBackend(fupdate.managerBackends["choco"])
+	assert len(candidates) > 0
+	assert set(candidates.column("released")) == {1700000000.0}
@@ -0,0 +1,53 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fupdate
+
+@pytest.fixture
+def github(monkeypatch):
+	"""Stands in for fetchGithubChangelog. Returns the URLs it was asked for"""
+	requestedURLs = []
+	started = threading.Event()
+	release = threading.Event()
+
+	def fetchGithubChangelog(repoURL, version):
+		requestedURLs.append(repoURL)
+		started.set()
+		release.wait(5)
+		return "* Fixed a bug in " + version
+
+	monkeypatch.setattr(fupdate, "fetchGithubChangelog", fetchGithubChangelog)
+	monkeypatch.setattr(fupdate, "githubToken", "token")
+	fupdate.resetGithubChangelogs()
+	return requestedURLs, started, release
+
+def testEveryCallerOfARepoAndTagSendsTheSameRequest(github):
+	requestedURLs, started, release = github
+	results = []
+
+	# choco's release notes URL asks first, pip's Source URL waits for it
+	choco = threading.Thread(target=lambda: results.append(fupdate.getGithubChangelog("https://github.com/dotnet/core/blob/main/release-notes/8.0/8.0.1/8.0.1.md", "v8.0.1")))
+	choco.start()
+	started.wait(5)
+	pip = threading.Thread(target=lambda: results.append(fupdate.getGithubChangelog(fupdate.urllib.parse.urlparse("https://github.com/dotnet/core"), "8.0.1")))
+	pip.start()
+	release.set()
+	choco.join()
+	pip.join()
+
+	assert requestedURLs == ["https://github.com/dotnet/core"]
+	assert results == ["* Fixed a bug in 8.0.1", "* Fixed a bug in 8.0.1"]
+	assert fupdate.githubChangelogStatistics == {"requested": 2, "fetched": 1}
+
+@pytest.mark.parametrize("repoURL, key", [
+	("git+https://github.com/OJ/Gobuster.git", ("oj", "gobuster", "3.6.0")),
+	("git@github.com:oj/gobuster.git", ("oj", "gobuster", "3.6.0")),
+	("https://github.com/OJ/gobuster/v3", ("oj", "gobuster", "3.6.0")),
+	("https://gitlab.com/OJ/gobuster", None),
+])
+def testGetGithubChangelogKey(repoURL, key):
+	assert fupdate.getGithubChangelogKey(repoURL, "v3.6.0") == key
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fupdate
+
+@pytest.mark.parametrize("newVersion, oldVersion, bump", [
+	# semver
+	("1.2.4", "1.2.3", "patch"),
+	("1.3.0", "1.2.3", "minor"),
+	("v2.0.0", "1.9.9", "major"),
+	("1.2.3", "1.2.3", ""),
+	("1.2.3", "1.2.4", ""),
+	("1.10.0", "1.9.0", "minor"),
+	# 2 and 4 parts
+	("1.20", "1.19.4", "minor"),
+	("2.0", "1.9", "major"),
+	("7.1.0.57", "7.1.0.56", "patch"),
+	("7.2.0.0", "7.1.0.56", "minor"),
+	("8.0.0.1", "7.1.0.56", "major"),
+	("1.0.0.0", "1.0", ""),
+	# calver never counts as major
+	("24.02.29", "23.12.15", "minor"),
+	("24.02.29", "24.02.01", "patch"),
+	("2024.01.0", "2023.12.1", "minor"),
+	("2023.12.2", "2023.12.1", "patch"),
+	# ...but two digit majors without zero padding are semver, whatever year it is
+	("11.0.0", "10.5.2", "major"),
+	("21.0.0", "20.11.0", "major"),
+	("16.0", "15.4", "major"),
+	("20", "19", "major"),
+	("27", "26", "major"),
+	("29.0.0", "28.1.2", "major"),
+	("10.3", "10.2", "minor"),
+	# letter releases and final labels
+	("1.1.1w", "1.1.1v", "patch"),
+	("1.1.1a", "1.1.1", "patch"),
+	("1.1.2", "1.1.1w", "patch"),
+	("1.0.0.Final", "1.0.0", ""),
+	("1.0.0-GA", "1.0.0-rc1", "patch"),
+	("1.0.1.RELEASE", "1.0.0.RELEASE", "patch"),
+	# pre-releases and PEP 440
+	("1.0.0", "1.0.0-rc.1", "patch"),
+	("1.0.0-rc.2", "1.0.0-rc.1", "patch"),
+	("1.0.0-beta", "1.0.0-alpha", "patch"),
+	("1.0.0-alpha", "1.0.0", ""),
+	("2.0rc1", "1.9", "major"),
+	("2.0", "2.0rc1", "patch"),
+	("2.0.post1", "2.0", "patch"),
+	("2.0", "2.0.dev3", "patch"),
+	("2.0a1", "2.0.dev3", "patch"),
+	("1!1.0", "2.0", "major"),
+	# go pseudo-versions are ordered by commit time
+	("v0.0.0-20230301000000-2d6232701089", "v0.0.0-20230201184804-2d6232701089", "patch"),
+	("v0.0.0-20230101000000-2d6232701089", "v0.0.0-20230201184804-2d6232701089", ""),
+	("v1.2.4-0.20230201184804-2d6232701089", "v1.2.3", "patch"),
+	("v1.2.4", "v1.2.4-0.20230201184804-2d6232701089", "patch"),
+	# unparseable
+	("latest", "1.0", None),
+	("1.0", "", None),
+])
+def testClassifyVersionChanges(newVersion, oldVersion, bump):
+	assert fupdate.classifyVersionChanges([newVersion], [oldVersion]) == [bump]
+
+@pytest.mark.parametrize("package, newVersion, oldVersion, bump", [
+	("pip", "24.0", "23.3.2", "minor"),
+	("black", "24.1.0", "23.12.1", "minor"),
+	("Black", "24.1.1", "24.1.0", "patch"),
+	("node", "24.0", "23.3.2", "major"),
+])
+def testCalendarVersionedPackages(package, newVersion, oldVersion, bump):
+	assert fupdate.classifyVersionChanges([newVersion], [oldVersion], [package]) == [bump]
+
+def testClassifyVersionChangesKeepsTheOrderOfThePairs():
+	assert fupdate.classifyVersionChanges(["2.0.0", "1.0.1", "1.0.0", "x"], ["1.0.0", "1.0.0", "1.0.0", "1.0.0"]) == ["major", "patch", "", None]
+
+def testCompileVersion():
+	assert fupdate.compileVersion("7.1.0.56") == (0, (7, 1, 0, 56), fupdate.finalVersionStage, 0, -1, fupdate.noDevNumber)
+	# Trailing zeros don't matter
+	assert fupdate.compileVersion("1.0.0") == fupdate.compileVersion("1") == fupdate.compileVersion("v1.0")
+	assert fupdate.compileVersion("1!2.0rc1.post2.dev3") == (1, (2,), fupdate.versionStages["rc"], 1, 2, 3)
+	assert fupdate.compileVersion("1.2.3+build.5") == fupdate.compileVersion("1.2.3")
+	assert fupdate.compileVersion("not a version") is None
+
+def testCompiledVersionsSortLikeTheVersions():
+	versions = ["1.0.dev1", "1.0a1", "1.0a2", "1.0b1", "1.0rc1", "1.0", "1.0.post1", "1.0.1", "1.0.1a", "1.0.1w", "1.1", "1!0.1"]
+	assert sorted(reversed(versions), key=fupdate.compileVersion) == versions
+
+def testParseVersionsReturnsOnlyUpgrades(capsys):
+	candidate = fupdate.parseVersions("v7.1.0.57", "7.1.0.56", "imagemagick", "choco")
+	assert (candidate.name, candidate.old, candidate.new, candidate.bump) == ("imagemagick", "7.1.0.56", "7.1.0.57", "patch")
+	assert fupdate.parseVersions("1.0", "1.0", "srt", "pip") is None
+	assert fupdate.parseVersions("latest", "1.0", "srt", "pip") is None
+	assert "Unable to parse the versions of" in capsys.readouterr().out